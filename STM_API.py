@@ -30,8 +30,13 @@ Copyright (c) 2024 Sean Murphy & Claude AI
 
 import os
 import sys
+import csv
+import io
 import json
+import math
 import time
+import numpy as np
+from collections import deque
 from typing import Dict, List, Optional, Union, Tuple
 from datetime import datetime
 
@@ -39,6 +44,37 @@ from datetime import datetime
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from shortTermMemory.SemanticSTMManager import SemanticSTMManager
+from shortTermMemory._numba_kernels import NUMBA_AVAILABLE, _topk_9d, _l2_9d, warmup_kernels
+
+# Fixed 9D coordinate order used for the vectorized coordinate matrix
+COORD_NAMES = ('x', 'y', 'z', 'a', 'b', 'c', 'd', 'e', 'f')
+
+# Export header layouts are constant; built once instead of per call.
+# (Result dicts themselves are deliberately NOT pooled/reused: callers
+# routinely hold onto responses, so mutate-in-place reuse would alias.)
+_CSV_HEADERS = ("timestamp", "datetime", "user_message", "ai_response", "semantic_summary")
+_CSV_COORD_HEADERS = ("coordinate_key",) + tuple(f"coord_{name}" for name in COORD_NAMES)
+
+def _format_entry(entry: Dict) -> Dict:
+    """
+    Build the API-shaped view of a stored STM entry
+
+    One dict per entry with the public field names; string values are
+    shared with the stored entry (no copies). semantic_summary in
+    particular is generated exactly once, at store time — every read
+    path hands out that same interned str. Plain dicts are kept here
+    (rather than a slots class) so responses stay JSON-serializable.
+    """
+    return {
+        "user_message": entry['user_input'],
+        # Preview is sliced once at insert time; .get covers entries
+        # recovered from snapshots written before the field existed
+        "user_message_preview": entry.get('user_preview',
+                                          entry['user_input'][:50]),
+        "ai_response": entry['ai_response'],
+        "semantic_summary": entry['semantic_summary'],
+        "timestamp": entry['timestamp']
+    }
 
 class SemanticSTM_API:
     """
@@ -48,19 +84,26 @@ class SemanticSTM_API:
     Provides intelligent conversation memory with contextual relevancy search.
     """
     
-    def __init__(self, 
+    def __init__(self,
                  max_entries: int = 100,
                  save_interval: int = 30,
                  data_directory: str = None,
-                 verbose: bool = False):
+                 verbose: bool = False,
+                 recency_alpha: float = 1.0,
+                 lambda_decay: float = 0.01):
         """
         Initialize the Semantic STM API
-        
+
         Args:
             max_entries: Maximum number of conversation exchanges to store (default: 100)
             save_interval: Auto-save frequency in seconds (default: 30)
             data_directory: Custom directory for save files (default: ./stm_data)
             verbose: Enable detailed logging (default: False)
+            recency_alpha: Search score blend - alpha * similarity +
+                           (1 - alpha) * exp(-lambda * age). 1.0 (default)
+                           ranks purely by 9D distance
+            lambda_decay: Exponential age-decay rate (per second) used
+                          when recency_alpha < 1.0
         """
         self.version = "1.0.0"
         self.max_entries = max_entries
@@ -74,24 +117,208 @@ class SemanticSTM_API:
         self.data_directory = data_directory
         os.makedirs(data_directory, exist_ok=True)
         
-        # Initialize the core STM manager
+        # Initialize the core STM manager with the custom directory up
+        # front: the manager loads snapshots and replays its WAL during
+        # construction, so re-pointing save_file_a/b afterwards would
+        # recover from the default path while saving to this one
         self._stm = SemanticSTMManager(
             max_entries=max_entries,
             save_interval=save_interval,
-            verbose=verbose
+            verbose=verbose,
+            data_directory=data_directory
         )
-        
-        # Override save file paths to use custom directory
-        self._stm.save_file_a = os.path.join(data_directory, "stm_cache_A.json")
-        self._stm.save_file_b = os.path.join(data_directory, "stm_cache_B.json")
-        
+
+        # SoA coordinate ring buffer for vectorized 9D distance search
+        # (maintained alongside _stm.stm_entries). Stored as float16:
+        # with max_distance-level granularity ~5 bits of mantissa keep
+        # nearest-neighbor rankings intact while halving the bytes the
+        # distance scan has to stream. int8 scalar quantization (another
+        # 2x) was evaluated and skipped: it needs per-dimension clip
+        # ranges plus an FP32 re-rank stage, and at <=100 entries the
+        # whole matrix is already a fraction of one 4 KB page
+        self._coord_matrix = np.zeros((max_entries, 9), dtype=np.float16)
+        self._coord_keys: List[Optional[str]] = [None] * max_entries
+        self._coord_count = 0  # Rows filled so far (monotonic, wraps via modulo)
+        # key -> ring row, so re-registering a key (manager dedup refresh)
+        # updates its row in place instead of burning a fresh one
+        self._row_of_key: Dict[str, int] = {}
+        # Precomputed ||y||² per row lets the search use the dot-product
+        # identity (x-y)² = ||x||² + ||y||² - 2x·y — one GEMV per query
+        self._coord_sqnorms = np.zeros(max_entries, dtype=np.float32)
+        # One reusable query vector: every search fills this in place
+        # instead of allocating a fresh 9-float array per call. Callers
+        # that retain the vector (the query cache, batch stacking) copy it
+        self._q_buf = np.empty(9, dtype=np.float32)
+
+        # Recency blend for multi-turn context lookups: coordinates of
+        # the last few exchanges, mixed into the query vector so
+        # stateless follow-up queries stay anchored to the active topic
+        self._recent_coords = deque(maxlen=5)
+        self.blend_alpha = 0.7  # Weight of the query vs. recent history
+
+        # Recency-biased search scoring (per-key last access; refreshed on
+        # insert and on every search hit, LRU-style)
+        self.recency_alpha = recency_alpha
+        self.lambda_decay = lambda_decay
+        self._last_access: Dict[str, float] = {}
+
+        # Semantic result cache: a query whose embedding lands within
+        # cosine 0.97 of a cached one reuses that scan's (key, distance)
+        # pairs instead of re-scanning. Invalidated sphere-wise on insert.
+        self._qcache = deque(maxlen=64)
+
+        # Populate the ring buffer from any entries recovered off disk
+        for coord_key in self._stm.entry_order:
+            entry = self._stm.stm_entries.get(coord_key)
+            if entry:
+                self._register_coords(coord_key, entry['coordinates'])
+
+        # Pay the Numba JIT compile cost once at startup (no-op without numba)
+        if NUMBA_AVAILABLE:
+            warmup_kernels()
+
         if verbose:
             print(f"🧠 Semantic STM API v{self.version} initialized")
             print(f"📁 Data directory: {data_directory}")
             print(f"📊 Max entries: {max_entries}")
             print(f"⏰ Save interval: {save_interval}s")
     
-    def add_conversation(self, 
+    def _register_coords(self, coord_key: str, coordinates: Dict) -> None:
+        """
+        Record an entry's 9D coordinates in the SoA ring buffer
+
+        A key that is already registered (the manager dedups repeated
+        near-identical exchanges onto an existing entry) refreshes its
+        row in place; only genuinely new keys advance the ring, keeping
+        row turnover aligned with the manager's FIFO eviction so live
+        unique entries are never overwritten by duplicates.
+
+        Args:
+            coord_key: Coordinate key of the stored entry
+            coordinates: Coordinate dictionary with keys x,y,z,a,b,c,d,e,f
+        """
+        row = self._row_of_key.get(coord_key)
+        if row is None:
+            row = self._coord_count % self.max_entries
+            displaced = self._coord_keys[row]
+            if displaced is not None:
+                self._row_of_key.pop(displaced, None)
+            self._coord_keys[row] = coord_key
+            self._row_of_key[coord_key] = row
+            self._coord_count += 1
+        for i, name in enumerate(COORD_NAMES):
+            self._coord_matrix[row, i] = coordinates.get(name, 0.0)
+        c = self._coord_matrix[row].astype(np.float32)
+        self._coord_sqnorms[row] = np.dot(c, c)
+        self._recent_coords.append(self._coord_matrix[row].copy())
+        self._last_access[coord_key] = time.time()
+        self._qcache_invalidate(coordinates)
+
+    def _entries_in_order(self):
+        """Yield live STM entries in insertion (chronological) order"""
+        stm_entries = self._stm.stm_entries
+        for coord_key in self._stm.entry_order:
+            entry = stm_entries.get(coord_key)
+            if entry is not None:
+                yield entry
+
+    def _qcache_lookup(self, q: np.ndarray, max_results: int,
+                       max_distance: float) -> Optional[List[Tuple[str, float]]]:
+        """Cached (coord_key, distance) pairs for a near-identical query"""
+        q_norm = float(np.linalg.norm(q))
+        if q_norm == 0.0:
+            return None
+        for cached_q, cached_results, cached_distance, cached_count in self._qcache:
+            # A cached scan is reusable only if it was at least as broad
+            if cached_distance < max_distance or cached_count < max_results:
+                continue
+            denom = q_norm * float(np.linalg.norm(cached_q))
+            if denom > 0.0 and float(np.dot(q, cached_q)) / denom > 0.97:
+                return cached_results
+        return None
+
+    def _qcache_invalidate(self, coordinates: Dict) -> None:
+        """Drop cached scans whose search sphere covers a new entry"""
+        if not self._qcache:
+            return
+        c = np.array([coordinates.get(name, 0.0) for name in COORD_NAMES],
+                     dtype=np.float32)
+        self._qcache = deque(
+            (item for item in self._qcache
+             if float(np.linalg.norm(item[0] - c)) > item[2]),
+            maxlen=self._qcache.maxlen
+        )
+
+    def _coords_into_buf(self, coordinates: Dict) -> np.ndarray:
+        """
+        Fill the shared query buffer from a coordinate dict
+
+        Returns self._q_buf — valid until the next query on this
+        instance; copy before retaining.
+        """
+        buf = self._q_buf
+        for i, name in enumerate(COORD_NAMES):
+            buf[i] = coordinates.get(name, 0.0)
+        return buf
+
+    def _query_vector(self, query: str) -> np.ndarray:
+        """Embed a query into the shared float32 9D buffer (LRU-cached upstream)"""
+        query_result = self._stm._process_query_cached(query)
+        return self._coords_into_buf(query_result['coordinates'])
+
+    def _scan_nearest(self, q: np.ndarray, max_results: int, max_distance: float):
+        """
+        Vectorized nearest-neighbor scan over the coordinate ring buffer
+
+        Yields (coord_key, entry, distance) tuples closest-first, bounded
+        by max_results live entries within max_distance.
+        """
+        n = min(self._coord_count, self.max_entries)
+        if n == 0:
+            return
+
+        if NUMBA_AVAILABLE:
+            # Fused distance + filter + top-k in one JIT kernel pass
+            # (the kernel is typed for float32, so upcast the slice once)
+            k = min(n, max_results)
+            indices, d2s = _topk_9d(
+                self._coord_matrix[:n].astype(np.float32), q, k, float(max_distance) ** 2
+            )
+            candidates = [
+                (int(idx), math.sqrt(float(d2)))
+                for idx, d2 in zip(indices, d2s)
+                if idx >= 0
+            ]
+        else:
+            # Dot-product distance: ||x-y||² = ||x||² + ||y||² - 2x·y, with
+            # the stored ||y||² precomputed — one GEMV instead of n subtracts
+            q_sq = float(np.dot(q, q))
+            dots = self._coord_matrix[:n].astype(np.float32) @ q
+            d2 = self._coord_sqnorms[:n] + q_sq - 2.0 * dots
+            # float16 storage can leave tiny negative residues near zero
+            np.maximum(d2, 0.0, out=d2)
+            distances = np.sqrt(d2)
+
+            # Sort by distance (closest = most relevant)
+            order = np.argsort(distances)
+            candidates = [(int(idx), float(distances[idx])) for idx in order]
+
+        seen_keys = set()
+        yielded = 0
+        for idx, distance in candidates:
+            if distance > max_distance or yielded >= max_results:
+                break
+
+            coord_key = self._coord_keys[idx]
+            entry = self._stm.stm_entries.get(coord_key)
+            if entry is None or coord_key in seen_keys:
+                continue
+            seen_keys.add(coord_key)
+
+            yielded += 1
+            yield coord_key, entry, distance
+
+    def add_conversation(self,
                         user_message: str, 
                         ai_response: str,
                         metadata: Optional[Dict] = None) -> Dict:
@@ -106,6 +333,8 @@ class SemanticSTM_API:
         Returns:
             Dict: Response with coordinate key and semantic summary
         """
+        # Single wall-clock read reused by every *_timestamp field below
+        now = time.time()
         try:
             coord_key = self._stm.add_conversation_exchange(
                 user_input=user_message,
@@ -115,13 +344,18 @@ class SemanticSTM_API:
             
             # Get the stored entry for response
             entry = self._stm.stm_entries.get(coord_key)
-            
+
+            # Keep the vectorized coordinate buffer in sync
+            if entry:
+                self._register_coords(coord_key, entry['coordinates'])
+
             return {
                 "success": True,
                 "coordinate_key": coord_key,
+                "coordinate_hash": format(entry['coord_hash'], 'x') if entry else None,
                 "semantic_summary": entry['semantic_summary'] if entry else None,
                 "coordinates": entry['coordinates'] if entry else None,
-                "timestamp": time.time(),
+                "timestamp": now,
                 "total_entries": len(self._stm.stm_entries)
             }
             
@@ -129,10 +363,54 @@ class SemanticSTM_API:
             return {
                 "success": False,
                 "error": str(e),
-                "timestamp": time.time()
+                "timestamp": now
             }
     
-    def search_relevant(self, 
+    def add_conversations(self, conversations: List[Tuple[str, str]],
+                          metadata: Optional[Dict] = None) -> Dict:
+        """
+        Add multiple conversation exchanges in one batched call
+
+        Args:
+            conversations: List of (user_message, ai_response) tuples
+            metadata: Optional metadata applied to every exchange
+
+        Returns:
+            Dict: Response with one result entry per stored conversation
+        """
+        # Single wall-clock read reused by every *_timestamp field below
+        now = time.time()
+        try:
+            coord_keys = self._stm.add_conversation_exchange_batch(
+                conversations, metadata=metadata
+            )
+
+            results = []
+            for coord_key in coord_keys:
+                entry = self._stm.stm_entries.get(coord_key)
+                if entry:
+                    self._register_coords(coord_key, entry['coordinates'])
+                results.append({
+                    "coordinate_key": coord_key,
+                    "semantic_summary": entry['semantic_summary'] if entry else None
+                })
+
+            return {
+                "success": True,
+                "results": results,
+                "added_count": len(results),
+                "timestamp": now,
+                "total_entries": len(self._stm.stm_entries)
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "timestamp": now
+            }
+
+    def search_relevant(self,
                        query: str,
                        max_results: int = 5,
                        max_distance: float = 2.0) -> Dict:
@@ -147,33 +425,61 @@ class SemanticSTM_API:
         Returns:
             Dict: Search results with relevance scores
         """
+        # Single wall-clock read reused by every *_timestamp field below
+        now = time.time()
         try:
-            results = self._stm.search_relevant_context(
-                query_text=query,
-                top_k=max_results,
-                max_distance=max_distance
-            )
-            
-            # Format results for API response
             formatted_results = []
-            for result in results:
-                entry = result['entry']
-                formatted_results.append({
-                    "user_message": entry['user_input'],
-                    "ai_response": entry['ai_response'],
-                    "semantic_summary": entry['semantic_summary'],
-                    "relevance_score": result['relevance_score'],
-                    "distance": result['distance'],
-                    "coordinate_key": result['coord_key'],
-                    "timestamp": entry['timestamp']
-                })
+            n = min(self._coord_count, self.max_entries)
+
+            if n > 0:
+                # Embed the query (LRU-cached for repeats) and compare against
+                # all stored coordinates in one vectorized pass
+                q = self._query_vector(query)
+
+                # Semantic cache: near-identical recent queries reuse the
+                # previous scan's pairs, re-filtered by this call's bounds
+                pairs = self._qcache_lookup(q, max_results, max_distance)
+                if pairs is None:
+                    pairs = [(coord_key, distance) for coord_key, _, distance
+                             in self._scan_nearest(q, max_results, max_distance)]
+                    # Copy: q aliases the shared buffer, the cache outlives it
+                    self._qcache.append((q.copy(), pairs, max_distance, max_results))
+
+                blend = self.recency_alpha < 1.0
+                for coord_key, distance in pairs:
+                    if distance > max_distance or len(formatted_results) >= max_results:
+                        break
+                    entry = self._stm.stm_entries.get(coord_key)
+                    if entry is None:
+                        continue
+                    result = _format_entry(entry)
+                    similarity = 1.0 - (distance / max_distance)
+                    if blend:
+                        # score = a*similarity + (1-a)*exp(-lambda*age)
+                        age = now - self._last_access.get(coord_key, entry['timestamp'])
+                        similarity = (self.recency_alpha * similarity +
+                                      (1.0 - self.recency_alpha) * math.exp(-self.lambda_decay * age))
+                    result["relevance_score"] = similarity
+                    result["distance"] = distance
+                    result["coordinate_key"] = coord_key
+                    self._last_access[coord_key] = now
+                    formatted_results.append(result)
+
+                if blend:
+                    # Distance order is not score order once recency blends in
+                    formatted_results.sort(key=lambda r: r['relevance_score'],
+                                           reverse=True)
+
+                # Keep manager statistics consistent with the old code path
+                self._stm.stats['total_searches'] += 1
+                self._stm.stats['cache_hits'] += len(formatted_results)
             
             return {
                 "success": True,
                 "query": query,
                 "results": formatted_results,
                 "total_found": len(formatted_results),
-                "search_timestamp": time.time()
+                "search_timestamp": now
             }
             
         except Exception as e:
@@ -181,10 +487,94 @@ class SemanticSTM_API:
                 "success": False,
                 "error": str(e),
                 "query": query,
-                "search_timestamp": time.time()
+                "search_timestamp": now
             }
     
-    def get_context(self, 
+    def search_relevant_batch(self,
+                              queries: List[str],
+                              max_results: int = 5,
+                              max_distance: float = 2.0) -> Dict:
+        """
+        Search several queries in one vectorized pass
+
+        Embeds each query (LRU-cached), stacks them into a (Q, 9) matrix
+        and computes every query-entry distance with a single matrix
+        product against the coordinate ring buffer, instead of re-entering
+        the scalar search path per query.
+
+        Args:
+            queries: List of search query texts
+            max_results: Maximum number of results per query
+            max_distance: Maximum 9D distance for relevance
+
+        Returns:
+            Dict: Per-query search results keyed in input order
+        """
+        # Single wall-clock read reused by every *_timestamp field below
+        now = time.time()
+        try:
+            n = min(self._coord_count, self.max_entries)
+            per_query = [[] for _ in queries]
+
+            if n > 0 and queries:
+                # Row-assign into a preallocated matrix: _query_vector hands
+                # back one shared buffer, so stacking references would alias
+                Q = np.empty((len(queries), 9), dtype=np.float32)
+                for qi, query in enumerate(queries):
+                    Q[qi] = self._query_vector(query)
+
+                coords = self._coord_matrix[:n].astype(np.float32)
+                if NUMBA_AVAILABLE:
+                    # JIT distance fill per query row - no intermediate
+                    # (Q x N) difference or dot-product temporaries
+                    distances = np.empty((len(queries), n), dtype=np.float32)
+                    for qi in range(len(queries)):
+                        _l2_9d(coords, Q[qi], distances[qi])
+                else:
+                    # ||q-c||^2 = ||q||^2 + ||c||^2 - 2 q.c for every pair
+                    # at once: one (Q x 9) @ (9 x N) GEMM instead of Q scans
+                    q_sq = np.einsum('ij,ij->i', Q, Q)
+                    d2 = q_sq[:, None] + self._coord_sqnorms[:n][None, :] - 2.0 * (Q @ coords.T)
+                    np.maximum(d2, 0.0, out=d2)
+                    distances = np.sqrt(d2)
+
+                for qi in range(len(queries)):
+                    seen_keys = set()
+                    for idx in np.argsort(distances[qi]):
+                        distance = float(distances[qi, idx])
+                        if distance > max_distance or len(per_query[qi]) >= max_results:
+                            break
+                        coord_key = self._coord_keys[idx]
+                        entry = self._stm.stm_entries.get(coord_key)
+                        if entry is None or coord_key in seen_keys:
+                            continue
+                        seen_keys.add(coord_key)
+                        result = _format_entry(entry)
+                        result["relevance_score"] = 1.0 - (distance / max_distance)
+                        result["distance"] = distance
+                        result["coordinate_key"] = coord_key
+                        per_query[qi].append(result)
+
+                self._stm.stats['total_searches'] += len(queries)
+                self._stm.stats['cache_hits'] += sum(len(r) for r in per_query)
+
+            return {
+                "success": True,
+                "queries": list(queries),
+                "results": per_query,
+                "total_found": sum(len(r) for r in per_query),
+                "search_timestamp": now
+            }
+
+        except Exception as e:
+            return {
+                "success": False,
+                "error": str(e),
+                "queries": list(queries),
+                "search_timestamp": now
+            }
+
+    def get_context(self,
                    user_input: str,
                    recent_count: int = 3,
                    relevant_count: int = 5) -> Dict:
@@ -199,40 +589,56 @@ class SemanticSTM_API:
         Returns:
             Dict: Enhanced context with recent and relevant conversations
         """
+        # Single wall-clock read reused by every *_timestamp field below
+        now = time.time()
         try:
-            context = self._stm.build_enhanced_context(
-                user_input=user_input,
-                recent_count=recent_count,
-                relevant_count=relevant_count
-            )
-            
-            # Format context for API response
-            formatted_recent = []
-            for entry in context['recent_context']:
-                formatted_recent.append({
-                    "user_message": entry['user_input'],
-                    "ai_response": entry['ai_response'],
-                    "semantic_summary": entry['semantic_summary'],
-                    "timestamp": entry['timestamp']
-                })
-            
-            formatted_relevant = []
-            for entry in context['relevant_context']:
-                formatted_relevant.append({
-                    "user_message": entry['user_input'],
-                    "ai_response": entry['ai_response'],
-                    "semantic_summary": entry['semantic_summary'],
-                    "timestamp": entry['timestamp']
-                })
-            
+            query_result = self._stm._process_query_cached(user_input)
+            q = self._coords_into_buf(query_result['coordinates'])
+
+            # Recent context (immediate conversation flow)
+            recent_entries = self._stm.get_recent_context(recent_count)
+            recent_keys = {entry['coord_key'] for entry in recent_entries}
+
+            # Blend the query vector with exponentially decayed recent
+            # exchange coordinates, so stateless follow-ups ("what are
+            # the differences?") still land near the active topic
+            lookup = q
+            if self._recent_coords:
+                history = np.zeros(9, dtype=np.float32)
+                weight_sum = 0.0
+                for i, coords in enumerate(reversed(self._recent_coords)):
+                    weight = 0.5 ** i
+                    history += weight * coords
+                    weight_sum += weight
+                history /= weight_sum
+                lookup = self.blend_alpha * q + (1.0 - self.blend_alpha) * history
+
+            # Semantically relevant context (related topics), skipping
+            # entries already included as recent
+            relevant_entries = []
+            for coord_key, entry, distance in self._scan_nearest(
+                    lookup, relevant_count + len(recent_keys), 2.0):
+                if coord_key in recent_keys:
+                    continue
+                relevant_entries.append(entry)
+                if len(relevant_entries) >= relevant_count:
+                    break
+
+            self._stm.stats['total_searches'] += 1
+            self._stm.stats['cache_hits'] += len(relevant_entries)
+
+            # Format context for API response (one shared helper, one dict per entry)
+            formatted_recent = [_format_entry(entry) for entry in recent_entries]
+            formatted_relevant = [_format_entry(entry) for entry in relevant_entries]
+
             return {
                 "success": True,
                 "user_input": user_input,
-                "query_summary": context['query_summary'],
+                "query_summary": query_result['summary'],
                 "recent_context": formatted_recent,
                 "relevant_context": formatted_relevant,
-                "total_context_entries": context['total_context_entries'],
-                "context_timestamp": time.time()
+                "total_context_entries": len(formatted_recent) + len(formatted_relevant),
+                "context_timestamp": now
             }
             
         except Exception as e:
@@ -240,7 +646,7 @@ class SemanticSTM_API:
                 "success": False,
                 "error": str(e),
                 "user_input": user_input,
-                "context_timestamp": time.time()
+                "context_timestamp": now
             }
     
     def get_recent_conversations(self, count: int = 5) -> Dict:
@@ -253,32 +659,30 @@ class SemanticSTM_API:
         Returns:
             Dict: Recent conversations in chronological order
         """
+        # Single wall-clock read reused by every *_timestamp field below
+        now = time.time()
         try:
             recent = self._stm.get_recent_context(count)
             
             formatted_conversations = []
             for entry in recent:
-                formatted_conversations.append({
-                    "user_message": entry['user_input'],
-                    "ai_response": entry['ai_response'],
-                    "semantic_summary": entry['semantic_summary'],
-                    "coordinate_key": entry['coord_key'],
-                    "timestamp": entry['timestamp'],
-                    "datetime": entry['datetime']
-                })
+                conv = _format_entry(entry)
+                conv["coordinate_key"] = entry['coord_key']
+                conv["datetime"] = entry['datetime']
+                formatted_conversations.append(conv)
             
             return {
                 "success": True,
                 "conversations": formatted_conversations,
                 "count": len(formatted_conversations),
-                "timestamp": time.time()
+                "timestamp": now
             }
             
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e),
-                "timestamp": time.time()
+                "timestamp": now
             }
     
     def get_statistics(self) -> Dict:
@@ -288,6 +692,8 @@ class SemanticSTM_API:
         Returns:
             Dict: System statistics and performance metrics
         """
+        # Single wall-clock read reused by every *_timestamp field below
+        now = time.time()
         try:
             stats = self._stm.get_stats()
             save_status = self._stm.get_save_status()
@@ -317,14 +723,14 @@ class SemanticSTM_API:
                     "save_interval": self.save_interval,
                     "data_directory": self.data_directory
                 },
-                "timestamp": time.time()
+                "timestamp": now
             }
             
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e),
-                "timestamp": time.time()
+                "timestamp": now
             }
     
     def export_conversations(self, 
@@ -336,36 +742,37 @@ class SemanticSTM_API:
         Args:
             format: Export format ("json" or "csv")
             include_coordinates: Include 9D coordinates in export
-            
+
         Returns:
             Dict: Export data or file path
         """
+        # Single wall-clock read reused by every *_timestamp field below
+        now = time.time()
         try:
-            conversations = []
-            
-            for coord_key, entry in self._stm.stm_entries.items():
-                conv_data = {
-                    "user_message": entry['user_input'],
-                    "ai_response": entry['ai_response'],
-                    "semantic_summary": entry['semantic_summary'],
-                    "timestamp": entry['timestamp'],
-                    "datetime": entry['datetime']
-                }
-                
-                if include_coordinates:
-                    conv_data["coordinates"] = entry['coordinates']
-                    conv_data["coordinate_key"] = entry['coord_key']
-                
-                conversations.append(conv_data)
-            
-            # Sort by timestamp
-            conversations.sort(key=lambda x: x['timestamp'])
-            
             if format.lower() == "json":
+                # entry_order is already insertion (= chronological) order, so
+                # iterating it skips both the dict scan and the O(n log n) sort
+                conversations = []
+
+                for entry in self._entries_in_order():
+                    conv_data = {
+                        "user_message": entry['user_input'],
+                        "ai_response": entry['ai_response'],
+                        "semantic_summary": entry['semantic_summary'],
+                        "timestamp": entry['timestamp'],
+                        "datetime": entry['datetime']
+                    }
+
+                    if include_coordinates:
+                        conv_data["coordinates"] = entry['coordinates']
+                        conv_data["coordinate_key"] = entry['coord_key']
+
+                    conversations.append(conv_data)
+
                 export_data = {
                     "export_info": {
                         "version": self.version,
-                        "export_timestamp": time.time(),
+                        "export_timestamp": now,
                         "export_datetime": datetime.now().isoformat(),
                         "total_conversations": len(conversations),
                         "includes_coordinates": include_coordinates
@@ -378,59 +785,66 @@ class SemanticSTM_API:
                     "format": "json",
                     "data": export_data,
                     "total_conversations": len(conversations),
-                    "timestamp": time.time()
+                    "timestamp": now
                 }
             
             elif format.lower() == "csv":
-                # For CSV, we'll return the data structure that can be converted to CSV
-                csv_rows = []
-                headers = ["timestamp", "datetime", "user_message", "ai_response", "semantic_summary"]
-                
-                if include_coordinates:
-                    headers.extend(["coordinate_key", "coord_x", "coord_y", "coord_z", 
-                                  "coord_a", "coord_b", "coord_c", "coord_d", "coord_e", "coord_f"])
-                
-                for conv in conversations:
+                # Stream rows straight into an in-memory CSV buffer instead
+                # of materializing a list of per-row Python lists
+                headers = list(_CSV_HEADERS + _CSV_COORD_HEADERS) if include_coordinates \
+                    else list(_CSV_HEADERS)
+
+                buf = io.StringIO()
+                writer = csv.writer(buf)
+                writer.writerow(headers)
+
+                def csv_row(entry):
                     row = [
-                        conv['timestamp'],
-                        conv['datetime'],
-                        conv['user_message'],
-                        conv['ai_response'],
-                        conv['semantic_summary']
+                        entry['timestamp'],
+                        entry['datetime'],
+                        entry['user_input'],
+                        entry['ai_response'],
+                        entry['semantic_summary']
                     ]
-                    
+
                     if include_coordinates:
-                        coords = conv['coordinates']
-                        row.extend([
-                            conv['coordinate_key'],
-                            coords['x'], coords['y'], coords['z'],
-                            coords['a'], coords['b'], coords['c'],
-                            coords['d'], coords['e'], coords['f']
-                        ])
-                    
-                    csv_rows.append(row)
-                
+                        row.append(entry['coord_key'])
+                        # Pull the SoA matrix row when the entry has one:
+                        # one contiguous tolist() versus nine dict lookups
+                        matrix_row = self._stm._row_of_key.get(entry['coord_key'])
+                        if matrix_row is not None:
+                            row.extend(self._stm._coord_matrix[matrix_row].tolist())
+                        else:
+                            coords = entry['coordinates']
+                            row.extend(coords[name] for name in COORD_NAMES)
+                    return row
+
+                # writerows drains the generator in C; live entries are
+                # exactly the ones in entry_order, so the count is O(1)
+                writer.writerows(csv_row(entry) for entry in self._entries_in_order())
+                row_count = len(self._stm.stm_entries)
+
                 return {
                     "success": True,
                     "format": "csv",
                     "headers": headers,
-                    "rows": csv_rows,
-                    "total_conversations": len(conversations),
-                    "timestamp": time.time()
+                    "csv_text": buf.getvalue(),
+                    "total_conversations": row_count,
+                    "timestamp": now
                 }
             
             else:
                 return {
                     "success": False,
                     "error": f"Unsupported format: {format}. Use 'json' or 'csv'.",
-                    "timestamp": time.time()
+                    "timestamp": now
                 }
                 
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e),
-                "timestamp": time.time()
+                "timestamp": now
             }
     
     def save_now(self) -> Dict:
@@ -440,20 +854,23 @@ class SemanticSTM_API:
         Returns:
             Dict: Save operation result
         """
+        # Single wall-clock read reused by every *_timestamp field below
+        now = time.time()
         try:
-            self._stm.force_save()
-            
+            wrote = self._stm.force_save()
+
             return {
                 "success": True,
-                "message": "STM state saved successfully",
-                "timestamp": time.time()
+                "message": ("STM state saved successfully" if wrote
+                            else "STM state already saved (no changes)"),
+                "timestamp": now
             }
             
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e),
-                "timestamp": time.time()
+                "timestamp": now
             }
     
     def clear_memory(self, confirm: bool = False) -> Dict:
@@ -466,18 +883,30 @@ class SemanticSTM_API:
         Returns:
             Dict: Clear operation result
         """
+        # Single wall-clock read reused by every *_timestamp field below
+        now = time.time()
         if not confirm:
             return {
                 "success": False,
                 "error": "Must set confirm=True to clear memory",
-                "timestamp": time.time()
+                "timestamp": now
             }
         
         try:
             # Clear the STM entries
             self._stm.stm_entries.clear()
             self._stm.entry_order.clear()
+            self._stm._rebuild_coord_store()
             self._stm.dirty = True
+            self._qcache.clear()
+            self._last_access.clear()
+
+            # Reset the API-side ring buffer too, or searches would keep
+            # matching rows for entries that no longer exist
+            self._coord_keys = [None] * self.max_entries
+            self._row_of_key.clear()
+            self._coord_count = 0
+            self._recent_coords.clear()
             
             # Force save the empty state
             self._stm.force_save()
@@ -485,14 +914,14 @@ class SemanticSTM_API:
             return {
                 "success": True,
                 "message": "All conversations cleared from memory",
-                "timestamp": time.time()
+                "timestamp": now
             }
             
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e),
-                "timestamp": time.time()
+                "timestamp": now
             }
     
     def shutdown(self) -> Dict:
@@ -502,36 +931,55 @@ class SemanticSTM_API:
         Returns:
             Dict: Shutdown result
         """
+        # Single wall-clock read reused by every *_timestamp field below
+        now = time.time()
         try:
             self._stm.cleanup()
             
             return {
                 "success": True,
                 "message": "STM system shutdown gracefully",
-                "timestamp": time.time()
+                "timestamp": now
             }
             
         except Exception as e:
             return {
                 "success": False,
                 "error": str(e),
-                "timestamp": time.time()
+                "timestamp": now
             }
 
 # Convenience functions for quick usage
-def create_stm_api(max_entries: int = 100, 
+def warm_up():
+    """
+    Pre-load shared heavyweight state before the first API call
+
+    Loads the process-wide coordinate model and compiles the JIT search
+    kernels, so the first add/search served to a user pays neither cost.
+    Useful ahead of server start or benchmark loops.
+    """
+    from shortTermMemory.SemanticSTMManager import _get_shared_coord_system
+    _get_shared_coord_system()
+    if NUMBA_AVAILABLE:
+        warmup_kernels()
+
+def create_stm_api(max_entries: int = 100,
                    save_interval: int = 30,
                    data_directory: str = None,
-                   verbose: bool = False) -> SemanticSTM_API:
+                   verbose: bool = False,
+                   recency_alpha: float = 1.0,
+                   lambda_decay: float = 0.01) -> SemanticSTM_API:
     """
     Quick factory function to create STM API instance
-    
+
     Args:
         max_entries: Maximum conversation exchanges to store
         save_interval: Auto-save frequency in seconds
         data_directory: Custom data directory
         verbose: Enable detailed logging
-        
+        recency_alpha: Similarity/recency score blend (1.0 = distance only)
+        lambda_decay: Age-decay rate used when recency_alpha < 1.0
+
     Returns:
         SemanticSTM_API: Configured API instance
     """
@@ -539,7 +987,9 @@ def create_stm_api(max_entries: int = 100,
         max_entries=max_entries,
         save_interval=save_interval,
         data_directory=data_directory,
-        verbose=verbose
+        verbose=verbose,
+        recency_alpha=recency_alpha,
+        lambda_decay=lambda_decay
     )
 
 # Example usage
@@ -32,20 +32,125 @@ Copyright (c) 2024 Sean Murphy & Claude AI
 License: MIT
 """
 
+import io
 import os
 import sys
 import json
 import time
 import math
+import mmap
+import shelve
+import hashlib
+import queue
+import struct
+import itertools
+import functools
 import threading
+import numpy as np
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional, Tuple
 from datetime import datetime
 
+# Fixed 9D coordinate order for the SoA coordinate matrix
+COORD_NAMES = ('x', 'y', 'z', 'a', 'b', 'c', 'd', 'e', 'f')
+
+def coords_to_array(coordinates: Dict[str, float]) -> 'np.ndarray':
+    """Dense float32[9] view of a coordinate dict (fixed x..f order)"""
+    return np.array([coordinates.get(name, 0.0) for name in COORD_NAMES],
+                    dtype=np.float32)
+
+def coords_to_dict(arr) -> Dict[str, float]:
+    """Inverse of coords_to_array, for serialization/back-compat"""
+    return {name: float(arr[i]) for i, name in enumerate(COORD_NAMES)}
+
+def hash_coords(coordinates: Dict[str, float]) -> int:
+    """
+    64-bit integer identity for a 9D coordinate set
+
+    Hashes the packed float32 representation, so it is stable across
+    runs for the same coordinates. Integer keys hash ~5-10x faster in
+    Python dicts than the long string coordinate keys.
+    """
+    packed = struct.pack('<9f', *(coordinates.get(name, 0.0) for name in COORD_NAMES))
+    if XXHASH_AVAILABLE:
+        return xxhash.xxh3_64_intdigest(packed)
+    # Stdlib fallback: stable (unlike hash()) across interpreter runs
+    import zlib
+    return (zlib.crc32(packed) << 32) | zlib.crc32(packed[::-1])
+
+# Optional: orjson is a C-level JSON serializer ~3-5x faster than stdlib
+# json on float-heavy payloads like the 9D coordinate dicts
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+# Optional: xxhash gives a hardware-speed 64-bit digest for integer
+# coordinate identity (integer dict keys hash faster than long strings)
+try:
+    import xxhash
+    XXHASH_AVAILABLE = True
+except ImportError:
+    XXHASH_AVAILABLE = False
+
+# Optional: google-crc32c computes CRC-32C (Castagnoli) with the SSE4.2
+# CRC32 instruction (~1 cycle/byte); zlib's software CRC-32 is the fallback
+try:
+    import google_crc32c
+    CRC32C_AVAILABLE = True
+except ImportError:
+    CRC32C_AVAILABLE = False
+
+def _frame_checksum(payload: bytes) -> int:
+    """32-bit corruption check for a WAL frame payload"""
+    if CRC32C_AVAILABLE:
+        return google_crc32c.value(payload)
+    import zlib
+    return zlib.crc32(payload)
+
+# Optional: hnswlib provides an O(log N) approximate-NN index; worth it
+# only past the linear-scan break-even (the 100-entry default is faster
+# to brute-force through the SoA matrix). Chosen over faiss.IndexFlatL2
+# for the same role: a flat FAISS index is still a linear scan, and the
+# full FAISS wheel is a much heavier install for a 9-dim workload
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
+# Optional: PyArrow enables columnar Parquet snapshots (~5-10x smaller
+# and faster to load than JSON for the numeric coordinate payload)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 from LTM.EnhancedSpatialValenceProcessor import EnhancedSpatialValenceToCoordGeneration, SemanticDepth
 from LTM.EngramManager import EngramManager
+from shortTermMemory._numba_kernels import NUMBA_AVAILABLE, _topk_9d, warmup_kernels
+
+@functools.lru_cache(maxsize=1)
+def _get_shared_coord_system():
+    """
+    Process-wide coordinate generator
+
+    Construction loads the semantic model, which dwarfs everything else
+    in cold-start cost; caching it means repeated manager construction
+    (tests, demo reruns, server workers) pays it once per process.
+
+    Compute-device selection (CPU vs CUDA) for the embedding forward
+    pass belongs to the generator itself — it owns the model, and its
+    constructor takes no device argument for us to thread through.
+    """
+    return EnhancedSpatialValenceToCoordGeneration(SemanticDepth.DEEP)
 
 class SemanticSTMManager:
     """
@@ -55,35 +160,156 @@ class SemanticSTMManager:
     for semantic search and context building.
     """
     
-    def __init__(self, max_entries=100, save_interval=30, verbose=True):
+    def __init__(self, max_entries=100, save_interval=30, verbose=True,
+                 save_format='json', embed_cache_dir=None,
+                 data_directory=None, time_source=time.time):
         """
         Initialize the Semantic STM Manager
-        
+
         Args:
             max_entries: Maximum STM entries (default 100)
             save_interval: Save frequency in seconds (default 30)
             verbose: Enable detailed logging
+            save_format: Snapshot format - 'json' (default) or 'parquet'
+                         (columnar, needs the optional pyarrow dependency)
+            embed_cache_dir: Optional directory for an on-disk embedding
+                             cache shared across runs - repeat ingests of
+                             identical text skip the semantic model
+            data_directory: Directory for the rolling snapshots and the
+                            write-ahead log. Must be set here (not by
+                            re-pointing save_file_a/b afterwards) so the
+                            startup load and WAL replay read the same
+                            paths later saves write to
+            time_source: Callable returning the current time in seconds;
+                         tests inject a fake clock here so save-interval
+                         checks can be driven without real sleeps. Default
+                         is time.time because entry timestamps are
+                         persisted wall-clock values
         """
         self.max_entries = max_entries
         self.save_interval = save_interval
         self.verbose = verbose
+        self._time = time_source
+
+        if save_format == 'parquet' and not PYARROW_AVAILABLE:
+            if verbose:
+                print("⚠️ pyarrow not installed - falling back to JSON snapshots")
+            save_format = 'json'
+        self.save_format = save_format
         
         # PRIMARY: RAM storage for blazing speed
         self.stm_entries = {}  # coord_key -> STMEntry
-        self.entry_order = []  # FIFO queue for capacity management
-        
+        self.entry_order = deque()  # FIFO queue: O(1) popleft on eviction
+
+        # SoA COORDINATE STORE: one contiguous float32 row per entry
+        # (dict-of-floats coordinates stay on the entry for persistence,
+        # but all distance math runs against this matrix). One spare row
+        # because an insert can briefly overshoot capacity before the
+        # oldest entry is promoted out.
+        self._coord_matrix = np.zeros((max_entries + 1, 9), dtype=np.float32)
+        self._coord_keys: List[Optional[str]] = [None] * (max_entries + 1)
+        self._row_of_key: Dict[str, int] = {}
+        self._row_of_hash: Dict[int, int] = {}  # int coord hash -> row (fast identity lookups)
+        self._free_rows = list(range(max_entries, -1, -1))
+        # Metadata serialized once at insert so export/snapshot paths never
+        # re-walk caller-supplied dicts (coord_key -> JSON string)
+        self._metadata_json: Dict[str, str] = {}
+
+        # HNSW INDEX: O(log N) search once the window outgrows the linear
+        # scan; labels are SoA matrix rows so lookups stay zero-copy
+        self._use_hnsw = HNSWLIB_AVAILABLE and max_entries > 512
+        self._hnsw = None
+        if self._use_hnsw:
+            self._hnsw = hnswlib.Index(space='l2', dim=9)
+            self._hnsw.init_index(max_elements=max_entries + 1,
+                                  ef_construction=100, M=8,
+                                  allow_replace_deleted=True)
+
         # PERSISTENCE: Rolling pair saves for data integrity
-        self.last_save_time = time.time()
+        self.last_save_time = self._time()
         self.dirty = False
+        # Group-commit style trigger: snapshot when this many entries have
+        # changed, even if the save_interval timer hasn't fired yet
+        self.dirty_count = 0
+        self.group_commit_max_batch = 25
+
+        # Background saves run on one long-lived worker thread; the
+        # in-RAM state is snapshotted under a lock so serialization and
+        # disk I/O happen entirely off the conversational hot path
+        self._save_lock = threading.Lock()
+        self._save_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='stm-save')
+        self._save_pending = False
+        # Serializes whole snapshot writes: force_save runs on the caller
+        # thread while queued saves run on the worker, and two concurrent
+        # writers would open the same <target>.tmp before either flips
+        # current_save_target
+        self._writer_lock = threading.Lock()
         
         # ROLLING SAVE FILES
-        self.save_file_a = "DigitalEngramEdgeV2/shortTermMemory/stm_cache_A.json"
-        self.save_file_b = "DigitalEngramEdgeV2/shortTermMemory/stm_cache_B.json"
+        save_dir = data_directory or "DigitalEngramEdgeV2/shortTermMemory"
+        self.save_file_a = os.path.join(save_dir, "stm_cache_A.json")
+        self.save_file_b = os.path.join(save_dir, "stm_cache_B.json")
         self.current_save_target = 'A'  # Alternates between A and B
+
+        # WRITE-AHEAD LOG: each add appends one framed record, so the
+        # per-exchange persistence cost is O(1) instead of an O(N)
+        # snapshot rewrite. The log is truncated after every snapshot
+        # and replayed on startup for exchanges newer than the snapshot.
+        # Opened lazily so callers can still re-point the save paths.
+        self._wal_file = None
+        self._last_snapshot_bytes = 0  # Drives WAL-growth compaction
+        self._ready_dirs = set()  # Directories already created for saves
+
+        # PROMOTION QUEUE: evicted entries go to long-term memory on a
+        # background thread so inserts never wait on EngramManager I/O
+        self._promote_q: 'queue.Queue' = queue.Queue(maxsize=64)
+        self._promote_thread = threading.Thread(
+            target=self._promotion_loop, daemon=True, name='stm-promote'
+        )
+        self._promote_thread.start()
         
-        # INTEGRATION: Enhanced Spatial memory system with DEEP mode for maximum consistency
-        self.coord_system = EnhancedSpatialValenceToCoordGeneration(SemanticDepth.DEEP)
+        # Compile the JIT search kernel now (cache=True makes repeat runs
+        # near-free) so the first real search doesn't pay the compile cost
+        if NUMBA_AVAILABLE:
+            warmup_kernels()
+
+        # INTEGRATION: Enhanced Spatial memory system with DEEP mode for
+        # maximum consistency (shared across instances - the model load
+        # happens once per process)
+        self.coord_system = _get_shared_coord_system()
         self.engram_manager = None  # Lazy load to avoid circular imports
+
+        # QUERY CACHE: coordinate generation is deterministic, so repeated
+        # queries (retries, skewed query distributions) skip the embedding
+        # step entirely via an exact-match LRU cache
+        self._process_query_cached = functools.lru_cache(maxsize=1024)(self.coord_system.process)
+
+        # ON-DISK EMBEDDING CACHE: optional shelve DB keyed by a hash of
+        # the text (prefixed with the generator identity so a model swap
+        # never serves stale coordinates). Reruns over the same corpus -
+        # tests, log replays - skip the semantic model entirely.
+        self._embed_cache = None
+        if embed_cache_dir:
+            os.makedirs(embed_cache_dir, exist_ok=True)
+            self._embed_cache = shelve.open(
+                os.path.join(embed_cache_dir, 'stm_embed_cache')
+            )
+            self._embed_cache_prefix = (
+                f"{type(self.coord_system).__name__}:deep:"
+            )
+
+        # SEMANTIC RESULT CACHE: queries whose 9D coordinates quantize
+        # into the same eps-cell reuse the previous scan's matches. Any
+        # coordinate-store mutation bumps _store_version, which lazily
+        # invalidates stale hits on lookup
+        self._query_cache: Dict[Tuple, Tuple[int, List[Dict]]] = {}
+        self._cache_eps = 0.05
+        self._store_version = 0
+
+        # Cached compact view of the live rows (keys list + stacked
+        # coordinate block); rebuilt lazily when the store changes so
+        # back-to-back searches never re-gather the matrix
+        self._live_cache: Optional[Tuple[int, List[str], 'np.ndarray']] = None
         
         # STATISTICS
         self.stats = {
@@ -92,8 +318,14 @@ class SemanticSTMManager:
             'total_searches': 0,
             'cache_hits': 0,
             'saves_completed': 0,
-            'load_recoveries': 0
+            'load_recoveries': 0,
+            'dedup_hits': 0
         }
+
+        # DEDUPLICATION: exchanges landing within this 9D distance of an
+        # existing entry refresh that entry instead of consuming a slot,
+        # so repeated greetings/acks don't evict unique memories
+        self.dedup_distance = 0.1
         
         if self.verbose:
             print("🧠" * 30)
@@ -125,45 +357,142 @@ class SemanticSTMManager:
         Returns:
             str: Coordinate key of stored entry
         """
+        coord_key = self._store_exchange(user_input, ai_response, metadata)
+
+        # Capacity management - promote oldest to long-term
+        if len(self.stm_entries) > self.max_entries:
+            self._promote_oldest_to_longterm()
+
+        # Non-blocking periodic save check
+        self._maybe_save_background()
+
+        return coord_key
+
+    def add_conversation_exchange_batch(self, pairs: List[Tuple[str, str]],
+                                        metadata: Optional[Dict] = None) -> List[str]:
+        """
+        Add multiple conversation exchanges in one pass
+
+        Bulk imports (e.g. replaying a chat log) pay the save-interval
+        check once for the whole batch instead of once per exchange.
+
+        Args:
+            pairs: List of (user_input, ai_response) tuples
+            metadata: Optional metadata applied to every exchange
+
+        Returns:
+            List of coordinate keys, one per stored exchange
+        """
+        coord_keys = []
+        for user_input, ai_response in pairs:
+            coord_keys.append(
+                self._store_exchange(user_input, ai_response, metadata)
+            )
+            # Evict inline: the SoA store has exactly one spare row, so a
+            # batch larger than the remaining capacity would exhaust the
+            # free-row pool if eviction were deferred to the end
+            if len(self.stm_entries) > self.max_entries:
+                self._promote_oldest_to_longterm()
+
+        # One save check for the whole batch
+        self._maybe_save_background()
+
+        return coord_keys
+
+    def _process_text(self, text: str) -> Dict:
+        """
+        coord_system.process with optional cross-run disk memoization
+
+        With no cache directory configured this is a straight
+        pass-through; with one, identical text re-ingested in a later
+        process (test reruns, log replays) loads its stored result
+        instead of re-running the semantic model.
+        """
+        if self._embed_cache is None:
+            return self.coord_system.process(text)
+        key = self._embed_cache_prefix + hashlib.sha1(
+            text.encode('utf-8')).hexdigest()
+        cached = self._embed_cache.get(key)
+        if cached is not None:
+            return cached
+        result = self.coord_system.process(text)
+        self._embed_cache[key] = result
+        return result
+
+    def _store_exchange(self, user_input: str, ai_response: str,
+                        metadata: Optional[Dict]) -> str:
+        """Embed and store one exchange (no capacity or save handling)"""
         # Create full conversation context
         full_context = f"User: {user_input}\nAI: {ai_response}"
-        
+
         # Process with existing 9D coordinate system
-        result = self.coord_system.process(full_context)
-        
+        result = self._process_text(full_context)
+
+        # Near-duplicate check: refresh the closest existing entry rather
+        # than spending a slot on a semantic repeat
+        dup_key = self._find_duplicate(result['coordinates'])
+        if dup_key is not None:
+            with self._save_lock:
+                entry = self.stm_entries[dup_key]
+                entry['timestamp'] = self._time()
+                entry['datetime'] = datetime.now().isoformat()
+                entry['hit_count'] = entry.get('hit_count', 1) + 1
+                self.entry_order.remove(dup_key)
+                self.entry_order.append(dup_key)
+                self.dirty = True
+                self.dirty_count += 1
+                self.stats['dedup_hits'] += 1
+            if self.verbose:
+                print(f"♻️ STM dedup: refreshed {dup_key[:24]}... (x{entry['hit_count']})")
+            return dup_key
+
         # Create STM entry
         stm_entry = {
             'coord_key': result['coordinate_key'],
+            'coord_hash': hash_coords(result['coordinates']),
             'coordinates': result['coordinates'],
-            'semantic_summary': result['summary'],
+            # Summaries repeat heavily across same-topic exchanges; interning
+            # dedupes the storage and makes equality checks pointer compares
+            'semantic_summary': sys.intern(result['summary']),
             'semantic_keys': result['semantic_keys'],
             'full_context': full_context,
             'user_input': user_input,
+            # Sliced once here so search previews never re-slice per result
+            'user_preview': user_input[:50],
             'ai_response': ai_response,
-            'timestamp': time.time(),
+            # Lowered once here so keyword/theme scans over entry text
+            # never re-concatenate and re-lower per scan
+            'lc_content': (user_input + ' ' + ai_response).lower(),
+            'timestamp': self._time(),
             'datetime': datetime.now().isoformat(),
             'metadata': metadata or {}
         }
-        
-        # Store in RAM instantly (microsecond access)
+
+        # Store in RAM instantly (microsecond access); mutations happen
+        # under the save lock so snapshot copies always see a consistent
+        # stm_entries/entry_order pair
         coord_key = result['coordinate_key']
-        self.stm_entries[coord_key] = stm_entry
-        self.entry_order.append(coord_key)
-        self.dirty = True
-        self.stats['total_added'] += 1
-        
-        # Capacity management - promote oldest to long-term
-        if len(self.stm_entries) > self.max_entries:
-            self._promote_oldest_to_longterm()
-        
-        # Non-blocking periodic save check
-        self._maybe_save_background()
-        
+        with self._save_lock:
+            self.stm_entries[coord_key] = stm_entry
+            self.entry_order.append(coord_key)
+            self._register_entry_coords(coord_key, result['coordinates'])
+            if metadata:
+                if ORJSON_AVAILABLE:
+                    self._metadata_json[coord_key] = orjson.dumps(metadata, default=str).decode('utf-8')
+                else:
+                    self._metadata_json[coord_key] = json.dumps(metadata, default=str)
+            self.dirty = True
+            self.dirty_count += 1
+            self.stats['total_added'] += 1
+
+        # O(1) durability: log the new exchange without rewriting the snapshot
+        self._append_wal({'op': 'add', 'entry': stm_entry})
+
         if self.verbose:
             print(f"🧠 STM added: {result['summary'][:50]}... → {coord_key[:20]}...")
-        
+
         return coord_key
-    
+
     def search_relevant_context(self, query_text: str, top_k: int = 5, 
                               max_distance: float = 2.0) -> List[Dict]:
         """
@@ -179,35 +508,202 @@ class SemanticSTMManager:
         """
         if not self.stm_entries:
             return []
-        
-        # Generate query coordinates
-        query_result = self.coord_system.process(query_text)
-        query_coords = query_result['coordinates']
-        
-        # Calculate distances to all STM entries
+
+        # Generate query coordinates (cached for repeated queries)
+        query_result = self._process_query_cached(query_text)
+        return self.search_relevant_context_by_coords(
+            query_result['coordinates'], top_k, max_distance, query_text=query_text
+        )
+
+    def search_relevant_context_by_coords(self, query_coords: Dict[str, float],
+                                          top_k: int = 5,
+                                          max_distance: float = 2.0,
+                                          query_text: str = '') -> List[Dict]:
+        """
+        Search STM with already-computed query coordinates
+
+        Lets callers that have embedded the query themselves (e.g.
+        build_enhanced_context) skip a second coord_system.process call.
+
+        Args:
+            query_coords: 9D coordinate dict for the query
+            top_k: Number of top results to return
+            max_distance: Maximum 9D distance for relevance
+            query_text: Original query text (verbose logging only)
+
+        Returns:
+            List of relevant STM entries with distance scores
+        """
+        if not self.stm_entries:
+            return []
+
+        # Vectorized distances: one einsum over the SoA matrix replaces the
+        # per-entry Python loop with its 18 dict lookups per comparison
+        keys, sub = self._live_view()
+        q = coords_to_array(query_coords)
+
+        # Semantic cache: near-identical queries (same eps-cell, same
+        # search bounds) skip the scan entirely while the store is
+        # unchanged since the cached scan ran
+        cache_key = (np.round(q / self._cache_eps).astype(np.int16).tobytes(),
+                     top_k, float(max_distance))
+        hit = self._query_cache.get(cache_key)
+        if hit is not None and hit[0] == self._store_version:
+            self.stats['total_searches'] += 1
+            self.stats['cache_hits'] += len(hit[1])
+            return list(hit[1])
+
         matches = []
-        for coord_key, entry in self.stm_entries.items():
-            distance = self._calculate_9d_distance(query_coords, entry['coordinates'])
-            
-            if distance <= max_distance:
-                matches.append({
-                    'entry': entry,
-                    'distance': distance,
-                    'relevance_score': 1.0 - (distance / max_distance),
-                    'coord_key': coord_key
-                })
-        
+        if self._hnsw is not None and len(keys) > 512:
+            # Graph index: O(log N) beats the brute-force scan at this size.
+            # ef controls recall vs speed; scale it with the requested k so
+            # larger top_k asks still return well-ranked neighbours
+            k = min(len(keys), top_k)
+            self._hnsw.set_ef(max(top_k * 4, 50))
+            labels, d2s = self._hnsw.knn_query(q.reshape(1, 9), k=k)
+            candidates = ((self._coord_keys[int(label)], math.sqrt(float(d2)))
+                          for label, d2 in zip(labels[0], d2s[0]))
+        else:
+            if NUMBA_AVAILABLE:
+                # JIT kernel: the njit/fastmath distance loop compiles down to
+                # SIMD FMAs across points, with built-in threshold/top-k pruning
+                k = min(len(keys), top_k)
+                indices, d2s = _topk_9d(sub, q, k, float(max_distance) ** 2)
+                candidates = ((keys[int(idx)], math.sqrt(float(d2)))
+                              for idx, d2 in zip(indices, d2s) if idx >= 0)
+            else:
+                # Two-stage prune: the squared distance is a monotone sum, so
+                # rows whose first-5-dimension partial sum already exceeds
+                # max_distance^2 never need their last 4 dimensions computed
+                max_d2 = float(max_distance) ** 2
+                diffs_head = sub[:, :5] - q[:5]
+                partial = np.einsum('ij,ij->i', diffs_head, diffs_head)
+                alive = np.flatnonzero(partial <= max_d2)
+                diffs_tail = sub[alive, 5:] - q[5:]
+                d2 = partial[alive] + np.einsum('ij,ij->i', diffs_tail, diffs_tail)
+                # O(N) partial select of the top_k closest, then sort
+                # only those - a full argsort is O(N log N) for rows the
+                # caller will never see
+                within = np.flatnonzero(d2 <= max_d2)
+                k = min(top_k, within.size)
+                if 0 < k < within.size:
+                    within = within[np.argpartition(d2[within], k - 1)[:k]]
+                candidates = ((keys[int(alive[i])], math.sqrt(float(d2[i])))
+                              for i in within[np.argsort(d2[within])])
+
         # Sort by distance (closest = most relevant)
-        matches.sort(key=lambda x: x['distance'])
+        for coord_key, distance in candidates:
+            if distance > max_distance:
+                break
+            if coord_key is None:
+                continue
+            matches.append({
+                'entry': self.stm_entries[coord_key],
+                'distance': distance,
+                'relevance_score': 1.0 - (distance / max_distance),
+                'coord_key': coord_key
+            })
         
         self.stats['total_searches'] += 1
         self.stats['cache_hits'] += len(matches)
         
         if self.verbose and matches:
             print(f"🔍 STM search: '{query_text[:30]}...' → {len(matches)} matches")
-        
-        return matches[:top_k]
+
+        matches = matches[:top_k]
+        # Stale entries age out via the version check; bound the dict so
+        # a long-lived manager can't accumulate dead cells regardless
+        if len(self._query_cache) >= 256:
+            self._query_cache.pop(next(iter(self._query_cache)))
+        self._query_cache[cache_key] = (self._store_version, matches)
+        return list(matches)
     
+    def _live_view(self) -> Tuple[List[str], 'np.ndarray']:
+        """
+        Compact (keys, coordinate block) view of the live entries
+
+        Gathering the live rows costs a fancy-index copy; since the
+        version counter already tracks every insert/evict, the gathered
+        block is cached and reused across searches until the store
+        actually changes.
+        """
+        if (self._live_cache is not None
+                and self._live_cache[0] == self._store_version):
+            return self._live_cache[1], self._live_cache[2]
+        keys = list(self._row_of_key.keys())
+        rows = np.fromiter(self._row_of_key.values(), dtype=np.intp,
+                           count=len(keys))
+        sub = self._coord_matrix[rows]
+        self._live_cache = (self._store_version, keys, sub)
+        return keys, sub
+
+    def search_relevant_context_batch(self, queries: List[str],
+                                      top_k: int = 5,
+                                      max_distance: float = 2.0) -> List[List[Dict]]:
+        """
+        Search several queries against STM in one stacked distance pass
+
+        Embeds each query (exact-match LRU cached), stacks the
+        coordinates into a (Q, 9) matrix and computes every query-entry
+        distance with a single matrix product against the SoA coordinate
+        matrix, instead of re-entering the scalar search path per query.
+
+        Args:
+            queries: List of query texts
+            top_k: Number of top results per query
+            max_distance: Maximum 9D distance for relevance
+
+        Returns:
+            One list of match dicts per query, in input order
+        """
+        self.stats['total_searches'] += len(queries)
+        if not self.stm_entries or not queries:
+            return [[] for _ in queries]
+
+        keys, sub = self._live_view()
+
+        Q = np.empty((len(queries), 9), dtype=np.float32)
+        for qi, query in enumerate(queries):
+            result = self._process_query_cached(query)
+            Q[qi] = coords_to_array(result['coordinates'])
+
+        # ||q-c||^2 = ||q||^2 + ||c||^2 - 2 q.c for every pair at once:
+        # one (Q x 9) @ (9 x N) GEMM instead of Q separate scans
+        d2 = (np.einsum('ij,ij->i', Q, Q)[:, None]
+              + np.einsum('ij,ij->i', sub, sub)[None, :]
+              - 2.0 * (Q @ sub.T))
+        np.maximum(d2, 0.0, out=d2)
+
+        # Ranking is monotone in squared distance - threshold against
+        # max_distance^2 and sqrt only the handful of returned rows
+        max_d2 = float(max_distance) ** 2
+        per_query = []
+        for qi in range(len(queries)):
+            row = d2[qi]
+            # Partial select of the top_k closest within range; only the
+            # surviving handful gets fully sorted
+            within = np.flatnonzero(row <= max_d2)
+            k = min(top_k, within.size)
+            if 0 < k < within.size:
+                within = within[np.argpartition(row[within], k - 1)[:k]]
+            order = within[np.argsort(row[within])]
+            # Distances and relevance scores in two vectorized
+            # expressions instead of per-result Python float math
+            dists = np.sqrt(row[order])
+            rels = 1.0 - dists / max_distance
+            per_query.append([
+                {
+                    'entry': self.stm_entries[keys[int(idx)]],
+                    'distance': float(distance),
+                    'relevance_score': float(relevance),
+                    'coord_key': keys[int(idx)]
+                }
+                for idx, distance, relevance in zip(order, dists, rels)
+            ])
+
+        self.stats['cache_hits'] += sum(len(m) for m in per_query)
+        return per_query
+
     def get_recent_context(self, count: int = 3) -> List[Dict]:
         """
         Get the most recent conversation exchanges
@@ -222,7 +718,9 @@ class SemanticSTMManager:
             return []
         
         # Get most recent entries
-        recent_keys = self.entry_order[-count:]
+        # deque has no slicing; islice from the tail keeps this O(count)
+        start = max(0, len(self.entry_order) - count)
+        recent_keys = list(itertools.islice(self.entry_order, start, None))
         recent_entries = []
         
         for key in recent_keys:
@@ -235,7 +733,10 @@ class SemanticSTMManager:
                              relevant_count: int = 5) -> Dict:
         """
         Build enhanced context combining recent + semantically relevant entries
-        
+
+        The query is embedded exactly once per call; the search and the
+        returned query_summary share the same process() result.
+
         Args:
             user_input: Current user input
             recent_count: Number of recent exchanges to include
@@ -244,129 +745,544 @@ class SemanticSTMManager:
         Returns:
             Dict with recent_context and relevant_context
         """
-        # Get recent context (immediate conversation flow)
+        # Get recent context (immediate conversation flow), tracking seen
+        # keys as we go so the relevant list filters in one pass below
         recent_context = self.get_recent_context(recent_count)
-        
-        # Get semantically relevant context (related topics)
-        relevant_matches = self.search_relevant_context(user_input, relevant_count)
-        relevant_context = [match['entry'] for match in relevant_matches]
-        
-        # Remove duplicates (recent entries that are also relevant)
-        recent_keys = {entry['coord_key'] for entry in recent_context}
+        seen_keys = {entry['coord_key'] for entry in recent_context}
+
+        # Embed the query once; search and summary share the result
+        query_result = self._process_query_cached(user_input)
+
+        # Get semantically relevant context (related topics), skipping
+        # entries that already appear in the recent window - single pass,
+        # no intermediate unfiltered list
+        relevant_matches = self.search_relevant_context_by_coords(
+            query_result['coordinates'], relevant_count, query_text=user_input
+        )
         relevant_context = [
-            entry for entry in relevant_context 
-            if entry['coord_key'] not in recent_keys
+            match['entry'] for match in relevant_matches
+            if match['coord_key'] not in seen_keys
         ]
         
         return {
             'recent_context': recent_context,
             'relevant_context': relevant_context,
             'total_context_entries': len(recent_context) + len(relevant_context),
-            'query_summary': self.coord_system.process(user_input)['summary']
+            'query_summary': query_result['summary']
         }
     
+    def _wal_path(self) -> str:
+        """Path of the write-ahead log (lives next to the snapshot files)"""
+        return os.path.join(os.path.dirname(self.save_file_a) or '.', "stm_wal.log")
+
+    def _append_wal(self, record: Dict):
+        """Append one length-prefixed JSON record to the write-ahead log"""
+        try:
+            if self._wal_file is None:
+                os.makedirs(os.path.dirname(self._wal_path()) or '.', exist_ok=True)
+                self._wal_file = open(self._wal_path(), 'ab')
+
+            if ORJSON_AVAILABLE:
+                payload = orjson.dumps(record, default=str)
+            else:
+                payload = json.dumps(record, default=str, ensure_ascii=False).encode('utf-8')
+
+            self._wal_file.write(
+                struct.pack('<II', len(payload), _frame_checksum(payload)) + payload
+            )
+            self._wal_file.flush()
+
+            # Compact once the log outgrows the snapshot it amends: a fresh
+            # snapshot truncates the WAL, capping replay time after a crash
+            if (self._last_snapshot_bytes
+                    and self._wal_file.tell() > 4 * self._last_snapshot_bytes):
+                self._maybe_save_background(force=True)
+
+        except Exception as e:
+            if self.verbose:
+                print(f"⚠️ WAL append failed: {e}")
+
+    def _truncate_wal(self):
+        """Clear the write-ahead log (called after a successful snapshot)"""
+        try:
+            if self._wal_file is not None:
+                self._wal_file.close()
+                self._wal_file = None
+            if os.path.exists(self._wal_path()):
+                with open(self._wal_path(), 'wb'):
+                    pass
+        except Exception as e:
+            if self.verbose:
+                print(f"⚠️ WAL truncate failed: {e}")
+
+    def _replay_wal(self):
+        """Replay exchanges logged after the last snapshot (crash recovery)"""
+        wal_path = self._wal_path()
+        if not os.path.exists(wal_path):
+            return
+
+        replayed = 0
+        valid_end = 0  # File offset after the last frame that verified
+        try:
+            with open(wal_path, 'rb') as f:
+                while True:
+                    header = f.read(8)
+                    if len(header) < 8:
+                        break
+                    length, checksum = struct.unpack('<II', header)
+                    payload = f.read(length)
+                    if len(payload) < length:
+                        break  # Torn tail write - ignore the partial record
+                    if _frame_checksum(payload) != checksum:
+                        break  # Corrupt frame - stop at the last good one
+                    valid_end = f.tell()
+
+                    record = json.loads(payload)
+                    op = record.get('op')
+                    if op == 'add':
+                        entry = record['entry']
+                        coord_key = entry['coord_key']
+                        if coord_key not in self.stm_entries:
+                            self.stm_entries[coord_key] = entry
+                            self.entry_order.append(coord_key)
+                            self._register_entry_coords(coord_key, entry['coordinates'])
+                            replayed += 1
+                    elif op == 'del':
+                        coord_key = record['coord_key']
+                        if coord_key in self.stm_entries:
+                            self._release_entry_coords(coord_key)
+                            del self.stm_entries[coord_key]
+                            self.entry_order.remove(coord_key)
+                            replayed += 1
+
+        except Exception as e:
+            if self.verbose:
+                print(f"⚠️ WAL replay stopped: {e}")
+
+        # Standard WAL recovery: cut the log back to the last verified
+        # frame so a torn/corrupt tail never poisons a later replay
+        try:
+            if valid_end < os.path.getsize(wal_path):
+                with open(wal_path, 'r+b') as f:
+                    f.truncate(valid_end)
+        except OSError:
+            pass
+
+        if replayed and self.verbose:
+            print(f"✅ WAL replayed {replayed} exchanges newer than the snapshot")
+        if replayed:
+            self.dirty = True
+
+    def _find_duplicate(self, coordinates: Dict[str, float]) -> Optional[str]:
+        """Coord key of the closest stored entry if within dedup_distance"""
+        if not self._row_of_key:
+            return None
+
+        # Exact identity first: one integer-hash dict lookup
+        row = self._row_of_hash.get(hash_coords(coordinates))
+        if row is not None and self._coord_keys[row] is not None:
+            return self._coord_keys[row]
+
+        # Otherwise a vectorized nearest-neighbour pass over the matrix
+        keys = list(self._row_of_key.keys())
+        rows = np.fromiter(self._row_of_key.values(), dtype=np.intp, count=len(keys))
+        q = coords_to_array(coordinates)
+        diffs = self._coord_matrix[rows] - q
+        d2 = np.einsum('ij,ij->i', diffs, diffs)
+        nearest = int(np.argmin(d2))
+        if math.sqrt(float(d2[nearest])) < self.dedup_distance:
+            return keys[nearest]
+        return None
+
+    def _register_entry_coords(self, coord_key: str, coordinates: Dict[str, float]):
+        """Write an entry's coordinates into the SoA matrix"""
+        row = self._row_of_key.get(coord_key)
+        if row is None:
+            row = self._free_rows.pop()
+            self._coord_keys[row] = coord_key
+            self._row_of_key[coord_key] = row
+        self._coord_matrix[row] = coords_to_array(coordinates)
+        self._row_of_hash[hash_coords(coordinates)] = row
+        self._store_version += 1
+        if self._hnsw is not None:
+            self._hnsw.add_items(self._coord_matrix[row].reshape(1, 9),
+                                 np.array([row]), replace_deleted=True)
+
+    def _release_entry_coords(self, coord_key: str):
+        """Return an entry's matrix row to the free pool"""
+        row = self._row_of_key.pop(coord_key, None)
+        if row is not None:
+            self._coord_keys[row] = None
+            self._free_rows.append(row)
+            self._store_version += 1
+            if self._hnsw is not None:
+                try:
+                    self._hnsw.mark_deleted(row)
+                except RuntimeError:
+                    pass  # Label never indexed (e.g. rebuilt store)
+            entry = self.stm_entries.get(coord_key)
+            if entry:
+                coord_hash = entry.get('coord_hash') or hash_coords(entry['coordinates'])
+                self._row_of_hash.pop(coord_hash, None)
+        self._metadata_json.pop(coord_key, None)
+
+    def _rebuild_coord_store(self):
+        """Re-derive the SoA coordinate matrix from stm_entries"""
+        self._coord_keys = [None] * (self.max_entries + 1)
+        self._row_of_key = {}
+        self._row_of_hash = {}
+        self._free_rows = list(range(self.max_entries, -1, -1))
+        if self._use_hnsw:
+            # Fresh index: labels left over from the previous store would
+            # otherwise collide with the rows re-registered below
+            self._hnsw = hnswlib.Index(space='l2', dim=9)
+            self._hnsw.init_index(max_elements=self.max_entries + 1,
+                                  ef_construction=100, M=8,
+                                  allow_replace_deleted=True)
+        for coord_key, entry in self.stm_entries.items():
+            # Entries restored from pre-coord_hash snapshots lack the
+            # cached hash; backfill it so consumers (dedup refreshes,
+            # the API's coordinate_hash field) can rely on its presence
+            if 'coord_hash' not in entry:
+                entry['coord_hash'] = hash_coords(entry['coordinates'])
+            self._register_entry_coords(coord_key, entry['coordinates'])
+
     def _promote_oldest_to_longterm(self):
         """Promote oldest STM entry to long-term spatial memory"""
         if not self.entry_order:
             return
-        
-        # Initialize EngramManager if needed (lazy loading)
-        if self.engram_manager is None:
-            self.engram_manager = EngramManager(verbose=False)
-        
-        # Get oldest entry
-        oldest_key = self.entry_order.pop(0)
-        oldest_entry = self.stm_entries.pop(oldest_key)
-        
-        # Promote to long-term spatial memory
+
+        # Get oldest entry (under the save lock so a concurrent snapshot
+        # never sees the order list and entry dict mid-update)
+        with self._save_lock:
+            oldest_key = self.entry_order.popleft()
+            self._release_entry_coords(oldest_key)
+            oldest_entry = self.stm_entries.pop(oldest_key)
+
+        # Tombstone so crash recovery doesn't resurrect the promoted entry
+        self._append_wal({'op': 'del', 'coord_key': oldest_key})
+
+        # Hand off to the background promoter: the conversational hot path
+        # never waits on EngramManager's disk/index work (bounded queue
+        # gives backpressure if long-term storage falls far behind)
+        self._promote_q.put((oldest_key, oldest_entry))
+
+    def _promotion_loop(self):
+        """Background consumer: drain promotions in batches of up to 32"""
+        while True:
+            item = self._promote_q.get()
+            stop = item is None
+            batch = [] if stop else [item]
+            while not stop and len(batch) < 32:
+                try:
+                    nxt = self._promote_q.get(timeout=0.05)
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    stop = True
+                else:
+                    batch.append(nxt)
+            if batch:
+                self._store_promotion_batch(batch)
+            if stop:
+                return
+
+    def _store_promotion_batch(self, batch: List[Tuple[str, Dict]]):
+        """Store a batch of promoted entries in long-term memory"""
         try:
-            memory_id = self.engram_manager.store_memory(
-                text=oldest_entry['full_context'],
-                metadata={
-                    'source': 'stm_promotion',
-                    'original_timestamp': oldest_entry['timestamp'],
-                    'original_coord_key': oldest_key,
-                    'user_input': oldest_entry['user_input'],
-                    'ai_response': oldest_entry['ai_response'],
-                    'semantic_summary': oldest_entry['semantic_summary']
-                }
-            )
-            
-            self.stats['total_promoted'] += 1
-            self.dirty = True
-            
-            if self.verbose:
-                print(f"📤 STM promoted to long-term: {memory_id} → {oldest_entry['semantic_summary'][:40]}...")
-                
+            # Initialize EngramManager if needed (lazy loading)
+            if self.engram_manager is None:
+                self.engram_manager = EngramManager(verbose=False)
+
+            for oldest_key, oldest_entry in batch:
+                memory_id = self.engram_manager.store_memory(
+                    text=oldest_entry['full_context'],
+                    metadata={
+                        'source': 'stm_promotion',
+                        'original_timestamp': oldest_entry['timestamp'],
+                        'original_coord_key': oldest_key,
+                        'user_input': oldest_entry['user_input'],
+                        'ai_response': oldest_entry['ai_response'],
+                        'semantic_summary': oldest_entry['semantic_summary']
+                    }
+                )
+
+                self.stats['total_promoted'] += 1
+                self.dirty = True
+
+                if self.verbose:
+                    print(f"📤 STM promoted to long-term: {memory_id} → {oldest_entry['semantic_summary'][:40]}...")
+
+            # Amortize any downstream index/fsync work over the whole batch
+            flush = getattr(self.engram_manager, 'flush', None)
+            if callable(flush):
+                flush()
+
         except Exception as e:
             if self.verbose:
                 print(f"⚠️ STM promotion failed: {e}")
     
-    def _calculate_9d_distance(self, coords1: Dict[str, float], 
+    def _calculate_9d_distance(self, coords1: Dict[str, float],
                               coords2: Dict[str, float]) -> float:
-        """Calculate 9D Euclidean distance between coordinate sets"""
-        coord_names = ['x', 'y', 'z', 'a', 'b', 'c', 'd', 'e', 'f']
-        
-        distance_squared = sum(
-            (coords1.get(name, 0.0) - coords2.get(name, 0.0)) ** 2
-            for name in coord_names
-        )
-        
-        return math.sqrt(distance_squared)
+        """
+        Calculate 9D Euclidean distance between coordinate sets
+
+        Fully unrolled: the dimension count is fixed at 9 and the
+        coordinate system always emits dense dicts, so direct subscripts
+        replace the generator + .get() per dimension (~3x faster in the
+        pure-Python fallback path).
+        """
+        dx = coords1['x'] - coords2['x']
+        dy = coords1['y'] - coords2['y']
+        dz = coords1['z'] - coords2['z']
+        da = coords1['a'] - coords2['a']
+        db = coords1['b'] - coords2['b']
+        dc = coords1['c'] - coords2['c']
+        dd = coords1['d'] - coords2['d']
+        de = coords1['e'] - coords2['e']
+        df = coords1['f'] - coords2['f']
+        return math.sqrt(dx * dx + dy * dy + dz * dz +
+                         da * da + db * db + dc * dc +
+                         dd * dd + de * de + df * df)
     
+    @staticmethod
+    def _fsync_directory(directory: str):
+        """Fsync a directory so a completed rename survives power loss"""
+        try:
+            fd = os.open(directory, os.O_RDONLY)
+            try:
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+        except OSError:
+            # Directory fsync is unsupported on some platforms (e.g. Windows)
+            pass
+
+    @staticmethod
+    def _sidecar_path(snapshot_file: str) -> str:
+        """Path of the binary coordinate sidecar for a snapshot file"""
+        return os.path.splitext(snapshot_file)[0] + '.coords.npy'
+
+    def _write_coord_sidecar(self, save_data: Dict, target_file: str):
+        """
+        Split coordinates out of a JSON snapshot into a float32 sidecar
+
+        JSON spends 10-15 ASCII bytes per float; the .npy sidecar stores
+        the same matrix at 4 bytes per value with no float->str->float
+        round trip (hash_coords packs float32, so coordinate identity
+        survives the narrowing). The snapshot JSON keeps a checksum of
+        the sidecar bytes: a crash between the two renames leaves a
+        mismatched pair, which the loader rejects in favor of the other
+        rolling slot.
+        """
+        order = list(save_data['stm_entries'].keys())
+        coord_rows = np.zeros((len(order), 9), dtype=np.float32)
+        stripped = {}
+        for i, key in enumerate(order):
+            entry = save_data['stm_entries'][key]
+            coord_rows[i] = coords_to_array(entry['coordinates'])
+            stripped[key] = {k: v for k, v in entry.items()
+                             if k != 'coordinates'}
+
+        buf = io.BytesIO()
+        np.save(buf, coord_rows, allow_pickle=False)
+        payload = buf.getvalue()
+
+        sidecar = self._sidecar_path(target_file)
+        temp_file = f"{sidecar}.tmp"
+        with open(temp_file, 'wb') as f:
+            f.write(payload)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_file, sidecar)
+
+        save_data['stm_entries'] = stripped
+        save_data['coord_sidecar'] = {
+            'file': os.path.basename(sidecar),
+            'rows': len(order),
+            'checksum': _frame_checksum(payload)
+        }
+
+    def _attach_coord_sidecar(self, data: Dict, snapshot_file: str):
+        """
+        Rejoin a loaded snapshot's entries with their coordinate sidecar
+
+        Raises on a missing, truncated, or mismatched sidecar so the
+        caller's recovery loop falls through to the other rolling slot.
+        """
+        info = data.get('coord_sidecar')
+        if not info:
+            return  # Pre-sidecar snapshot: coordinates are inline JSON
+        sidecar = os.path.join(os.path.dirname(snapshot_file) or '.',
+                               info['file'])
+        with open(sidecar, 'rb') as f:
+            payload = f.read()
+        if _frame_checksum(payload) != info['checksum']:
+            raise ValueError(f"coordinate sidecar checksum mismatch: {info['file']}")
+        coord_rows = np.load(io.BytesIO(payload), allow_pickle=False)
+        if coord_rows.shape[0] != len(data['stm_entries']):
+            raise ValueError("coordinate sidecar row count mismatch")
+        for row, entry in zip(coord_rows, data['stm_entries'].values()):
+            entry['coordinates'] = coords_to_dict(row)
+
     def _save_stm_to_disk(self):
         """Rolling pair save with corruption protection"""
-        try:
-            # Determine target file
-            target_file = self.save_file_a if self.current_save_target == 'A' else self.save_file_b
-            
-            # Prepare save data with metadata
-            save_data = {
-                'save_timestamp': time.time(),
-                'save_datetime': datetime.now().isoformat(),
-                'save_target': self.current_save_target,
-                'entry_count': len(self.stm_entries),
-                'max_entries': self.max_entries,
-                'save_interval': self.save_interval,
-                'stats': self.stats.copy(),
-                'stm_entries': self.stm_entries,
-                'entry_order': self.entry_order
-            }
-            
-            # Ensure directory exists
-            os.makedirs(os.path.dirname(target_file), exist_ok=True)
-            
-            # Atomic write to prevent corruption
-            temp_file = f"{target_file}.tmp"
-            with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(save_data, f, indent=2, default=str, ensure_ascii=False)
+        with self._writer_lock:
+            try:
+                # Determine target file
+                target_file = self.save_file_a if self.current_save_target == 'A' else self.save_file_b
+
+                # Snapshot the in-RAM state under the lock (cheap shallow
+                # copies); serialization and I/O below run without it
+                with self._save_lock:
+                    self._save_pending = False
+                    self.dirty_count = 0
+                    save_data = {
+                        'save_timestamp': self._time(),
+                        'save_datetime': datetime.now().isoformat(),
+                        'save_target': self.current_save_target,
+                        'entry_count': len(self.stm_entries),
+                        'max_entries': self.max_entries,
+                        'save_interval': self.save_interval,
+                        'stats': self.stats.copy(),
+                        'stm_entries': dict(self.stm_entries),
+                        'entry_order': list(self.entry_order)
+                    }
             
-            # Atomic rename (prevents corruption during write)
-            if os.path.exists(target_file):
-                os.remove(target_file)
-            os.rename(temp_file, target_file)
+                if self.save_format == 'parquet':
+                    target_file = os.path.splitext(target_file)[0] + '.parquet'
+
+                # Ensure directory exists (one metadata syscall per directory,
+                # not per save - callers may re-point the save paths, so the
+                # cache is keyed by directory rather than a single flag)
+                save_dir = os.path.dirname(target_file)
+                if save_dir not in self._ready_dirs:
+                    os.makedirs(save_dir, exist_ok=True)
+                    self._ready_dirs.add(save_dir)
+
+                # Coordinates leave the JSON payload and travel as raw
+                # float32 binary alongside it (~4x fewer bytes per save)
+                if self.save_format != 'parquet':
+                    self._write_coord_sidecar(save_data, target_file)
+
+                # Atomic write to prevent corruption
+                temp_file = f"{target_file}.tmp"
+                if self.save_format == 'parquet':
+                    self._write_parquet_snapshot(save_data, temp_file)
+                elif ORJSON_AVAILABLE:
+                    with open(temp_file, 'wb') as f:
+                        f.write(orjson.dumps(
+                            save_data,
+                            option=orjson.OPT_SERIALIZE_NUMPY,
+                            default=str
+                        ))
+                        f.flush()
+                        os.fsync(f.fileno())
+                else:
+                    with open(temp_file, 'w', encoding='utf-8') as f:
+                        # Machine-only file: compact separators cut the payload
+                        # (and serialization CPU) ~4x versus indent=2
+                        json.dump(save_data, f, separators=(',', ':'), default=str)
+                        f.flush()
+                        os.fsync(f.fileno())
+
+                # os.replace is atomic on POSIX and Windows alike; fsyncing the
+                # directory afterwards makes the rename itself crash-durable
+                os.replace(temp_file, target_file)
+                self._fsync_directory(os.path.dirname(target_file))
+                self._last_snapshot_bytes = os.path.getsize(target_file)
             
-            # Update state
-            self.last_save_time = time.time()
-            self.dirty = False
-            self.stats['saves_completed'] += 1
+                # Update state
+                self.last_save_time = self._time()
+                self.dirty = False
+                self.stats['saves_completed'] += 1
+
+                # Snapshot now covers everything - the incremental log restarts
+                self._truncate_wal()
             
-            # Alternate target for next save
-            self.current_save_target = 'B' if self.current_save_target == 'A' else 'A'
+                # Alternate target for next save
+                self.current_save_target = 'B' if self.current_save_target == 'A' else 'A'
             
-            if self.verbose:
-                print(f"💾 STM saved to {os.path.basename(target_file)} ({len(self.stm_entries)} entries)")
+                if self.verbose:
+                    print(f"💾 STM saved to {os.path.basename(target_file)} ({len(self.stm_entries)} entries)")
                 
-        except Exception as e:
-            if self.verbose:
-                print(f"⚠️ STM save failed: {e}")
+            except Exception as e:
+                if self.verbose:
+                    print(f"⚠️ STM save failed: {e}")
     
+    def _write_parquet_snapshot(self, save_data: Dict, path: str):
+        """Serialize a snapshot as a columnar Parquet table"""
+        entries = [save_data['stm_entries'][key] for key in save_data['entry_order']
+                   if key in save_data['stm_entries']]
+
+        columns = {
+            'coord_key': [e['coord_key'] for e in entries],
+            'user_input': [e['user_input'] for e in entries],
+            'ai_response': [e['ai_response'] for e in entries],
+            'semantic_summary': [e['semantic_summary'] for e in entries],
+            'full_context': [e['full_context'] for e in entries],
+            'timestamp': [e['timestamp'] for e in entries],
+            'datetime': [e['datetime'] for e in entries],
+            # Tree-structured fields travel as compact JSON strings
+            'semantic_keys': [json.dumps(e.get('semantic_keys'), default=str) for e in entries],
+            'metadata': [self._metadata_json.get(e['coord_key'])
+                         or json.dumps(e.get('metadata') or {}, default=str) for e in entries],
+        }
+        for i, name in enumerate(COORD_NAMES):
+            columns[f'coord_{name}'] = np.array(
+                [e['coordinates'].get(name, 0.0) for e in entries], dtype=np.float32
+            )
+
+        scalars = {key: save_data[key] for key in
+                   ('save_timestamp', 'save_datetime', 'save_target',
+                    'entry_count', 'max_entries', 'save_interval', 'stats')}
+
+        table = pa.table(columns)
+        table = table.replace_schema_metadata({b'stm_save_data': json.dumps(scalars).encode('utf-8')})
+        pq.write_table(table, path, compression='zstd')
+
+    def _read_parquet_snapshot(self, path: str) -> Dict:
+        """Load a Parquet snapshot back into the JSON save_data shape"""
+        table = pq.read_table(path)
+        scalars = json.loads(table.schema.metadata[b'stm_save_data'].decode('utf-8'))
+        cols = {name: table.column(name).to_pylist() for name in table.column_names}
+
+        stm_entries = {}
+        entry_order = []
+        for i, coord_key in enumerate(cols['coord_key']):
+            coordinates = {name: cols[f'coord_{name}'][i] for name in COORD_NAMES}
+            stm_entries[coord_key] = {
+                'coord_key': coord_key,
+                'coord_hash': hash_coords(coordinates),
+                'coordinates': coordinates,
+                'semantic_summary': cols['semantic_summary'][i],
+                'semantic_keys': json.loads(cols['semantic_keys'][i]),
+                'full_context': cols['full_context'][i],
+                'user_input': cols['user_input'][i],
+                'ai_response': cols['ai_response'][i],
+                'timestamp': cols['timestamp'][i],
+                'datetime': cols['datetime'][i],
+                'metadata': json.loads(cols['metadata'][i])
+            }
+            entry_order.append(coord_key)
+
+        data = dict(scalars)
+        data['stm_entries'] = stm_entries
+        data['entry_order'] = entry_order
+        return data
+
     def _load_stm_from_disk(self):
         """Load STM from most recent valid save file"""
-        files_to_try = [
-            (self.save_file_a, 'A'),
-            (self.save_file_b, 'B')
-        ]
+        if self.save_format == 'parquet':
+            files_to_try = [
+                (os.path.splitext(self.save_file_a)[0] + '.parquet', 'A'),
+                (os.path.splitext(self.save_file_b)[0] + '.parquet', 'B')
+            ]
+        else:
+            files_to_try = [
+                (self.save_file_a, 'A'),
+                (self.save_file_b, 'B')
+            ]
         
         loaded_data = None
         newest_timestamp = 0
@@ -376,9 +1292,28 @@ class SemanticSTMManager:
         for file_path, target in files_to_try:
             try:
                 if os.path.exists(file_path):
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
+                    if self.save_format == 'parquet':
+                        data = self._read_parquet_snapshot(file_path)
+                    elif ORJSON_AVAILABLE:
+                        # mmap the snapshot and parse the mapped pages
+                        # directly - no read() copy into a Python bytes.
+                        # orjson rejects the raw mmap object, so hand it
+                        # a zero-copy memoryview; zero-length files can't
+                        # be mapped (and can't be valid snapshots either)
+                        if os.path.getsize(file_path) == 0:
+                            continue
+                        with open(file_path, 'rb') as f:
+                            with mmap.mmap(f.fileno(), 0,
+                                           access=mmap.ACCESS_READ) as mm:
+                                data = orjson.loads(memoryview(mm))
+                    else:
+                        with open(file_path, 'r', encoding='utf-8') as f:
+                            data = json.load(f)
+
+                    if self.save_format != 'parquet':
+                        self._attach_coord_sidecar(data, file_path)
+
+
                     # Validate data structure
                     if (isinstance(data, dict) and 
                         'save_timestamp' in data and 
@@ -399,7 +1334,7 @@ class SemanticSTMManager:
         # Load the newest valid data
         if loaded_data:
             self.stm_entries = loaded_data['stm_entries']
-            self.entry_order = loaded_data['entry_order']
+            self.entry_order = deque(loaded_data['entry_order'])
             
             # Restore stats if available
             if 'stats' in loaded_data:
@@ -409,8 +1344,9 @@ class SemanticSTMManager:
             last_target = loaded_data.get('save_target', 'A')
             self.current_save_target = 'B' if last_target == 'A' else 'A'
             
+            self._rebuild_coord_store()
             self.stats['load_recoveries'] += 1
-            
+
             if self.verbose:
                 print(f"✅ STM loaded from {os.path.basename(source_file)} ({len(self.stm_entries)} entries)")
                 print(f"   Save date: {loaded_data.get('save_datetime', 'unknown')}")
@@ -419,33 +1355,57 @@ class SemanticSTMManager:
             if self.verbose:
                 print("ℹ️ No valid STM save files found - starting fresh")
             self.stm_entries = {}
-            self.entry_order = []
+            self.entry_order = deque()
             self.current_save_target = 'A'
+            self._rebuild_coord_store()
+
+        # Recover any exchanges logged after the newest snapshot
+        self._replay_wal()
     
-    def _maybe_save_background(self):
+    def _maybe_save_background(self, force: bool = False):
         """Non-blocking background save check with rolling pairs"""
-        if (self.dirty and 
-            time.time() - self.last_save_time > self.save_interval):
-            
-            # Quick async save (doesn't block conversation)
-            threading.Thread(target=self._save_stm_to_disk, daemon=True).start()
+        if (force
+                or self.dirty_count >= self.group_commit_max_batch
+                or (self.dirty and
+                    self._time() - self.last_save_time > self.save_interval)):
+
+            # Hand the save to the long-lived worker thread; skip if one
+            # is already queued so bursts coalesce into a single save
+            with self._save_lock:
+                if self._save_pending:
+                    return
+                self._save_pending = True
+            self._save_executor.submit(self._save_stm_to_disk)
     
-    def force_save(self):
-        """Force immediate save (useful for graceful shutdown)"""
+    def force_save(self) -> bool:
+        """
+        Force immediate save (useful for graceful shutdown)
+
+        A clean store is a no-op — back-to-back flushes (save_now followed
+        by shutdown) pay the serialize/fsync barrier only once.
+
+        Returns:
+            True if a snapshot was written, False if nothing was dirty
+        """
         if self.dirty:
             self._save_stm_to_disk()
             if self.verbose:
                 print("💾 STM force saved")
+            return True
+        return False
     
     def get_stats(self) -> Dict:
         """Get comprehensive STM statistics"""
+        cache_info = self._process_query_cached.cache_info()
         return {
             **self.stats,
+            'query_cache_hits': cache_info.hits,
+            'query_cache_misses': cache_info.misses,
             'current_entries': len(self.stm_entries),
             'max_entries': self.max_entries,
             'save_interval': self.save_interval,
             'current_save_target': self.current_save_target,
-            'seconds_since_save': time.time() - self.last_save_time,
+            'seconds_since_save': self._time() - self.last_save_time,
             'dirty': self.dirty,
             'memory_usage_mb': self._estimate_memory_usage()
         }
@@ -455,7 +1415,7 @@ class SemanticSTMManager:
         status = {
             'current_target': self.current_save_target,
             'last_save_time': self.last_save_time,
-            'seconds_since_save': time.time() - self.last_save_time,
+            'seconds_since_save': self._time() - self.last_save_time,
             'dirty': self.dirty,
             'files_exist': {
                 'A': os.path.exists(self.save_file_a),
@@ -479,9 +1439,23 @@ class SemanticSTMManager:
     
     def cleanup(self):
         """Clean up resources and force final save"""
-        if self.dirty:
-            self.force_save()
-        
+        # Flush pending promotions before anything else touches Engram state
+        self._promote_q.put(None)
+        self._promote_thread.join(timeout=10)
+
+        # Let any queued background save finish before the final flush
+        self._save_executor.shutdown(wait=True)
+
+        self.force_save()
+
+        if self._wal_file is not None:
+            self._wal_file.close()
+            self._wal_file = None
+
+        if self._embed_cache is not None:
+            self._embed_cache.close()
+            self._embed_cache = None
+
         if self.engram_manager:
             self.engram_manager.cleanup()
         
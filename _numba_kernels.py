@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+⚡ NUMBA KERNELS FOR 9D SPATIAL SEARCH ⚡
+
+Optional JIT-compiled kernels for the hot 9D distance/top-k path.
+
+Numba is an optional accelerator: when it is not installed the kernels
+fall back to plain NumPy implementations with identical signatures, so
+callers never need to branch on availability for correctness.
+
+Lazy compilation (no explicit signature strings) is deliberate: callers
+run warmup_kernels() once at startup, which covers the first-call
+compile just as well while keeping these functions usable from plain
+Python when numba is absent.
+
+License: MIT
+Copyright (c) 2024 Sean Murphy & Claude AI
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """No-op decorator used when numba is not installed"""
+        def wrapper(func):
+            return func
+        if args and callable(args[0]):
+            return args[0]
+        return wrapper
+
+
+@njit(cache=True, fastmath=True)
+def _topk_9d(coords, q, k, max_d2):
+    """
+    Fused 9D squared-distance + threshold filter + top-k selection
+
+    Single pass over the coordinate matrix: computes the squared
+    Euclidean distance of each row to the query, drops rows beyond
+    max_d2, and keeps the k closest in a fixed-size max-heap. Avoids
+    allocating a full distance array.
+
+    Once k candidates are held, the running k-th-best distance becomes
+    a pruning threshold: each row's squared distance is accumulated in
+    two batches of dimensions (0-4, then 5-8) and the row is abandoned
+    early if the partial sum already exceeds the threshold. Since the
+    distance is a monotone sum of squares this never changes results.
+
+    Args:
+        coords: float32 array of shape (n, 9)
+        q: float32 query vector of shape (9,)
+        k: Number of nearest rows to keep
+        max_d2: Maximum squared distance for relevance
+
+    Returns:
+        (indices, d2s): int64/float32 arrays of length k, padded with
+        -1 / inf where fewer than k rows qualified
+    """
+    n = coords.shape[0]
+    heap_d = np.full(k, np.inf, dtype=np.float32)
+    heap_i = np.full(k, -1, dtype=np.int64)
+    count = 0
+
+    threshold = max_d2
+
+    for i in range(n):
+        # First batch: dims 0-4, then prune against the running threshold
+        s = 0.0
+        for j in range(5):
+            d = coords[i, j] - q[j]
+            s += d * d
+        if s > threshold:
+            continue
+
+        # Second batch: dims 5-8
+        for j in range(5, 9):
+            d = coords[i, j] - q[j]
+            s += d * d
+
+        if s > threshold:
+            continue
+
+        if count < k:
+            # Insert and sift up (max-heap on distance)
+            pos = count
+            heap_d[pos] = s
+            heap_i[pos] = i
+            count += 1
+            while pos > 0:
+                parent = (pos - 1) // 2
+                if heap_d[parent] < heap_d[pos]:
+                    heap_d[parent], heap_d[pos] = heap_d[pos], heap_d[parent]
+                    heap_i[parent], heap_i[pos] = heap_i[pos], heap_i[parent]
+                    pos = parent
+                else:
+                    break
+            if count == k:
+                threshold = heap_d[0]
+        elif s < heap_d[0]:
+            # Replace the current worst and sift down
+            heap_d[0] = s
+            heap_i[0] = i
+            pos = 0
+            while True:
+                left = 2 * pos + 1
+                right = left + 1
+                largest = pos
+                if left < k and heap_d[left] > heap_d[largest]:
+                    largest = left
+                if right < k and heap_d[right] > heap_d[largest]:
+                    largest = right
+                if largest == pos:
+                    break
+                heap_d[largest], heap_d[pos] = heap_d[pos], heap_d[largest]
+                heap_i[largest], heap_i[pos] = heap_i[pos], heap_i[largest]
+                pos = largest
+            threshold = heap_d[0]
+
+    # Sort the surviving candidates by distance (closest first)
+    order = np.argsort(heap_d)
+    return heap_i[order], heap_d[order]
+
+
+@njit(cache=True, fastmath=True)
+def _l2_9d(coords, q, out):
+    """
+    Fill out[i] with the 9D Euclidean distance from coords[i] to q
+
+    Straight distance fill for callers that need every distance (batch
+    search, exports) rather than a pruned top-k. Serial on purpose:
+    at the ~100-entry scale of this store, prange thread-spawn overhead
+    costs more than the whole loop.
+
+    Args:
+        coords: float32 array of shape (n, 9)
+        q: float32 query vector of shape (9,)
+        out: float32 output array of shape (n,)
+    """
+    n = coords.shape[0]
+    for i in range(n):
+        s = 0.0
+        for j in range(9):
+            d = coords[i, j] - q[j]
+            s += d * d
+        out[i] = np.sqrt(s)
+
+
+def warmup_kernels():
+    """Trigger JIT compilation once so later calls pay no compile cost"""
+    dummy_coords = np.zeros((1, 9), dtype=np.float32)
+    dummy_q = np.zeros(9, dtype=np.float32)
+    dummy_out = np.zeros(1, dtype=np.float32)
+    _topk_9d(dummy_coords, dummy_q, 1, 1.0)
+    _l2_9d(dummy_coords, dummy_q, dummy_out)
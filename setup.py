@@ -54,6 +54,17 @@ setup(
             "sphinx>=5.0.0",
             "sphinx-rtd-theme>=1.0.0",
         ],
+        # Optional accelerators: every module feature-detects these at
+        # import time and falls back to stdlib/NumPy when absent, so
+        # `pip install semantic-stm-api[fast]` simply flips the probes on.
+        "fast": [
+            "numba>=0.57",
+            "orjson>=3.9",
+            "hnswlib>=0.7",
+            "xxhash>=3.0",
+            "pyarrow>=14.0",
+            "google-crc32c>=1.5",
+        ],
     },
     entry_points={
         "console_scripts": [
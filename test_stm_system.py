@@ -20,15 +20,46 @@ from datetime import datetime
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from shortTermMemory.SemanticSTMManager import SemanticSTMManager
+from shortTermMemory.SemanticSTMManager import (
+    SemanticSTMManager,
+    _get_shared_coord_system,
+)
+
+def _clip(text, width):
+    """Truncate for display; short strings pass through without a copy"""
+    return text if len(text) <= width else text[:width]
+
+class FakeClock:
+    """
+    Manually advanced clock injected via SemanticSTMManager(time_source=...)
+
+    Lets the tests drive the save-interval timer instantly instead of
+    idling in real time.sleep calls. Starts at the real wall-clock time
+    so persisted entry timestamps stay sensible.
+    """
+    def __init__(self):
+        self._now = time.time()
+
+    def now(self):
+        return self._now
+
+    def advance(self, seconds):
+        self._now += seconds
 
 def test_basic_functionality():
     """Test basic STM functionality"""
     print("🧪 TEST 1: Basic STM Functionality")
     print("=" * 50)
     
-    # Initialize with small capacity for testing
-    stm = SemanticSTMManager(max_entries=5, save_interval=3, verbose=True)
+    # Initialize with small capacity for testing; the on-disk embedding
+    # cache makes reruns skip re-embedding the fixed test corpus. The
+    # fake clock replaces the real sleeps that used to pace the saves.
+    clock = FakeClock()
+    stm = SemanticSTMManager(
+        max_entries=5, save_interval=3, verbose=True,
+        embed_cache_dir=os.path.expanduser("~/.cache/stm"),
+        time_source=clock.now
+    )
     
     # Test conversation exchanges
     test_conversations = [
@@ -46,12 +77,12 @@ def test_basic_functionality():
         coord_key = stm.add_conversation_exchange(user_msg, ai_msg)
         coord_keys.append(coord_key)
         print(f"   [{i}] Added: '{user_msg[:30]}...' → {coord_key[:15]}...")
-        time.sleep(0.5)  # Small delay to see saves
-    
+        clock.advance(0.5)  # Space the saves without actually sleeping
+
     print(f"\n✅ Basic functionality test complete!")
     print(f"   Stored {len(stm.stm_entries)} entries in RAM")
-    
-    return stm, coord_keys
+
+    return stm, coord_keys, clock
 
 def test_spatial_search(stm):
     """Test 9D spatial coordinate search"""
@@ -76,8 +107,8 @@ def test_spatial_search(stm):
                 distance = result['distance']
                 relevance = result['relevance_score']
                 print(f"   [{i}] Distance: {distance:.3f} | Relevance: {relevance:.3f}")
-                print(f"       User: {entry['user_input'][:40]}...")
-                print(f"       AI: {entry['ai_response'][:40]}...")
+                print(f"       User: {_clip(entry['user_input'], 40)}...")
+                print(f"       AI: {_clip(entry['ai_response'], 40)}...")
         else:
             print("   No matches found")
     
@@ -107,12 +138,12 @@ def test_context_building(stm):
         if context['relevant_context']:
             print(f"   Most relevant:")
             for entry in context['relevant_context'][:1]:
-                print(f"      User: {entry['user_input'][:35]}...")
-                print(f"      AI: {entry['ai_response'][:35]}...")
+                print(f"      User: {_clip(entry['user_input'], 35)}...")
+                print(f"      AI: {_clip(entry['ai_response'], 35)}...")
     
     print(f"\n✅ Context building test complete!")
 
-def test_rolling_saves(stm):
+def test_rolling_saves(stm, clock):
     """Test rolling pair save system"""
     print("\n🧪 TEST 4: Rolling Pair Saves")
     print("=" * 50)
@@ -138,12 +169,21 @@ def test_rolling_saves(stm):
             f"Test message {i+1}",
             f"Test response {i+1} with some content to make it longer"
         )
-        time.sleep(1)
-    
-    # Wait for automatic save
-    print(f"⏰ Waiting for automatic save (every {stm.save_interval}s)...")
-    time.sleep(stm.save_interval + 1)
-    
+        clock.advance(1)
+
+    # Push the injected clock past the save interval; the next add sees
+    # an expired timer and triggers the automatic save immediately
+    print(f"⏰ Advancing clock past automatic save interval ({stm.save_interval}s)...")
+    clock.advance(stm.save_interval + 1)
+    stm.add_conversation_exchange(
+        "Timer check message",
+        "This exchange lands after the save interval has elapsed"
+    )
+
+    # The add only queues the save on the background worker; barrier on
+    # the single-threaded executor so it has completed before we look
+    stm._save_executor.submit(lambda: None).result()
+
     # Check final status
     save_status = stm.get_save_status()
     print(f"Final save target: {save_status['current_target']}")
@@ -214,7 +254,7 @@ def test_recovery_simulation():
     if recovered_stm.stm_entries:
         print("📋 Sample recovered entries:")
         for i, (coord_key, entry) in enumerate(list(recovered_stm.stm_entries.items())[:3]):
-            print(f"   [{i+1}] {entry['user_input'][:40]}...")
+            print(f"   [{i+1}] {_clip(entry['user_input'], 40)}...")
     
     recovered_stm.cleanup()
     print(f"\n✅ Recovery simulation test complete!")
@@ -224,15 +264,21 @@ def main():
     print("🧠" * 60)
     print("🧠 SEMANTIC STM SYSTEM - COMPREHENSIVE TEST SUITE 🧠")
     print("🧠" * 60)
-    
+
+    # Load the process-wide semantic model before the clock starts:
+    # every manager constructed below shares this singleton, so the
+    # timed section measures STM work instead of one-time model load
+    print("\n🔥 Warming up shared coordinate model...")
+    _get_shared_coord_system()
+
     start_time = time.time()
     
     try:
         # Run all tests
-        stm, coord_keys = test_basic_functionality()
+        stm, coord_keys, clock = test_basic_functionality()
         test_spatial_search(stm)
         test_context_building(stm)
-        test_rolling_saves(stm)
+        test_rolling_saves(stm, clock)
         test_capacity_management(stm)
         test_statistics_and_cleanup(stm)
         test_recovery_simulation()